@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""Compare FITS tile-compression codecs: file size against read throughput.
+
+Each benchmark image is written uncompressed (float32), RICE-compressed
+with quantization and GZIP-compressed losslessly (see
+``generate_samples.compress_fits``). For every codec the benchmark
+records the file size, the time to compress, the quantization error, the
+time to read every pixel in row blocks and to read random 512 x 512
+cutouts (compressed images through ``CompImageHDU.section``), and then
+runs the image tools on the file as ``run_benchmarks.py`` does::
+
+    python benchmarks/codec_benchmark.py --profile small
+"""
+
+import argparse
+import json
+import os
+import time
+from datetime import datetime
+
+import numpy as np
+from astropy.io import fits
+
+import run_benchmarks as harness
+
+CODECS = ['none', 'rice', 'gzip']
+# Tools that read the image; run on every codec
+READER_TOOLS = [t for t in harness.IMAGE_TOOLS
+                if t[0] in ('image-stats', 'make-thumbnail', 'assess-quality')]
+# Pixels per row block of the full read, and the cutouts of the region read
+BLOCK_PIXELS = 4 * 1024 * 1024
+CUTOUT = 512
+N_CUTOUTS = 16
+
+
+def encoded_image(data_dir, size, codec, quantize_level):
+    """Benchmark image of ``size`` written with ``codec``; seconds to compress (None if cached)."""
+    image = harness.generate_image(data_dir, size)
+    if codec == 'none':
+        return image, None
+    path = os.path.join(data_dir, f'image-{size}-{codec}-q{quantize_level:g}.fits')
+    if os.path.exists(path):
+        return path, None
+    samples = harness.load_module(os.path.join(harness.ROOT, 'data', 'sample-fits', 'generate_samples.py'),
+                                  'generate_samples')
+    start = time.perf_counter()
+    samples.compress_fits(image, path, codec, quantize_level)
+    return path, time.perf_counter() - start
+
+
+def open_image(path):
+    """Open ``path``; returns the HDU list and its pixels (memmap or section)."""
+    hdul = fits.open(path, memmap=True)
+    for hdu in hdul:
+        if isinstance(hdu, fits.CompImageHDU):
+            return hdul, hdu.section
+        if hdu.data is not None:
+            return hdul, hdu.data
+    raise SystemExit(f"{path}: no image data")
+
+
+def read_full(path):
+    """Seconds to read every pixel in row blocks."""
+    start = time.perf_counter()
+    hdul, data = open_image(path)
+    with hdul:
+        ny, nx = data.shape
+        block_rows = max(1, BLOCK_PIXELS // nx)
+        for r0 in range(0, ny, block_rows):
+            np.asarray(data[r0:r0 + block_rows], dtype=np.float32).sum()
+    return time.perf_counter() - start
+
+
+def read_cutouts(path, seed=0):
+    """Mean seconds per random cutout, each from a freshly opened file."""
+    hdul, data = open_image(path)
+    with hdul:
+        ny, nx = data.shape
+    size = min(CUTOUT, ny, nx)
+    rng = np.random.default_rng(seed)
+    corners = list(zip(rng.integers(0, ny - size + 1, N_CUTOUTS), rng.integers(0, nx - size + 1, N_CUTOUTS)))
+    start = time.perf_counter()
+    for y0, x0 in corners:
+        hdul, data = open_image(path)
+        with hdul:
+            np.asarray(data[y0:y0 + size, x0:x0 + size], dtype=np.float32).sum()
+    return (time.perf_counter() - start) / N_CUTOUTS
+
+
+def quantization_error(reference, path):
+    """Largest absolute difference from ``reference``, in units of the image noise."""
+    worst, noise = 0.0, None
+    ref_hdul, ref = open_image(reference)
+    hdul, data = open_image(path)
+    with ref_hdul, hdul:
+        ny, nx = ref.shape
+        block_rows = max(1, BLOCK_PIXELS // nx)
+        for r0 in range(0, ny, block_rows):
+            a = np.asarray(ref[r0:r0 + block_rows], dtype=np.float64)
+            b = np.asarray(data[r0:r0 + block_rows], dtype=np.float64)
+            worst = max(worst, float(np.nanmax(np.abs(a - b))))
+            if noise is None:
+                noise = 1.4826 * float(np.median(np.abs(a - np.median(a))))
+    return worst, (worst / noise if noise else None)
+
+
+def run_codecs(profile, data_dir, work_dir, quantize_level, repeat, timeout):
+    os.makedirs(data_dir, exist_ok=True)
+    rows, tools = [], []
+    for size in harness.PROFILES[profile]['images']:
+        reference = harness.generate_image(data_dir, size)
+        pixel_mb = size * size * 4 / 1e6
+        print(f"Image {size}x{size} ({pixel_mb:.1f} MB of float32 pixels):")
+        for codec in CODECS:
+            path, compress_seconds = encoded_image(data_dir, size, codec, quantize_level)
+            full = min(read_full(path) for _ in range(repeat))
+            cutout = min(read_cutouts(path) for _ in range(repeat))
+            error, error_sigma = quantization_error(reference, path) if codec != 'none' else (0.0, 0.0)
+            row = {
+                'size': size,
+                'codec': codec,
+                'file_bytes': os.path.getsize(path),
+                'ratio': round(os.path.getsize(reference) / os.path.getsize(path), 3),
+                'compress_seconds': None if compress_seconds is None else round(compress_seconds, 4),
+                'full_read_seconds': round(full, 4),
+                'full_read_mb_per_s': round(pixel_mb / full, 1),
+                'cutout_ms': round(1000 * cutout, 2),
+                'max_abs_error': error,
+                'max_error_sigma': None if error_sigma is None else round(error_sigma, 4),
+            }
+            rows.append(row)
+            print(f"  {codec:5s} {row['file_bytes'] / 1e6:9.2f} MB  x{row['ratio']:<6.2f} "
+                  f"full {row['full_read_mb_per_s']:8.1f} MB/s  cutout {row['cutout_ms']:8.2f} ms  "
+                  f"error {row['max_error_sigma']} sigma")
+            for result in harness.run_sequence(READER_TOOLS, {'image': path},
+                                               os.path.join(work_dir, f'codec-{size}-{codec}'),
+                                               f'{size}px-{codec}', None, repeat, timeout):
+                tools.append({'codec': codec, 'size': size, **result})
+    return {
+        'profile': profile,
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'machine': harness.machine_info(),
+        'quantize_level': quantize_level,
+        'repeat': repeat,
+        'codecs': rows,
+        'tools': tools,
+    }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--profile', choices=sorted(harness.PROFILES), default='small',
+                        help='Image sizes, as for run_benchmarks.py')
+    parser.add_argument('--quantize-level', type=float, default=16.0,
+                        help='Quantization levels per noise sigma for rice')
+    parser.add_argument('--repeat', type=int, default=1,
+                        help='Repeat each measurement this many times and keep the fastest')
+    parser.add_argument('--timeout', type=float, default=3600,
+                        help='Seconds before a tool is killed')
+    parser.add_argument('--data-dir', default=os.path.join(harness.BENCH_DIR, 'data'),
+                        help='Where generated inputs are kept between runs')
+    parser.add_argument('--work-dir', default=os.path.join(harness.BENCH_DIR, 'work'),
+                        help='Where tools run')
+    parser.add_argument('--output',
+                        help='Results file (default: benchmarks/results/codecs-<profile>-<time>.json)')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    results = run_codecs(args.profile, args.data_dir, args.work_dir,
+                         args.quantize_level, args.repeat, args.timeout)
+    output = args.output or os.path.join(
+        harness.BENCH_DIR, 'results', f"codecs-{args.profile}-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results: {output}")
@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+"""Benchmark the Python scripts embedded in the exercise CWL tools.
+
+Each tool's scripts are extracted from its ``InitialWorkDirRequirement``
+listing and run directly with the current Python, without Docker or a CWL
+runner, against generated FITS images and synthetic measurement sets.
+For every run the harness records wall time, CPU time, peak RSS and the
+bytes read and written, and writes them to a JSON results file.
+
+Results can be saved as a baseline and later runs compared against it::
+
+    python benchmarks/run_benchmarks.py --profile small --save-baseline
+    python benchmarks/run_benchmarks.py --profile small --threshold 0.25
+
+The comparison exits with status 1 if any tool is slower (or uses more
+memory) than its baseline by more than the threshold.
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import re
+import shutil
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import yaml
+from astropy.io import fits
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_DIR = os.path.join(ROOT, 'benchmarks')
+BASELINE_DIR = os.path.join(BENCH_DIR, 'baselines')
+
+# Image tools run per image size, in order; later tools may use files
+# written by earlier ones through {run}. Placeholders: {image}, {run}.
+IMAGE_TOOLS = [
+    ('fits-header', 'exercises/02-fits-header/fits-header.cwl',
+     ['fits_header.py', '{image}', 'header.json']),
+    ('extract-header', 'exercises/03-imaging-pipeline/tools/extract-header.cwl',
+     ['extract_header.py', '{image}', 'header.json']),
+    ('image-stats', 'exercises/03-imaging-pipeline/tools/image-stats.cwl',
+     ['image_stats.py', '{image}', 'stats.json']),
+    ('make-thumbnail', 'exercises/03-imaging-pipeline/tools/make-thumbnail.cwl',
+     ['make_thumbnail.py', '{image}', 'thumbnail.png']),
+    ('analyze-image', 'exercises/03-imaging-pipeline/tools/analyze-image.cwl',
+     ['analyze_image.py', '{image}', 'header.json', 'stats.json', 'thumbnail.png']),
+    ('generate-report', 'exercises/03-imaging-pipeline/tools/generate-report.cwl',
+     ['generate_report.py', '{run}/analyze-image/header.json', '{run}/analyze-image/stats.json',
+      '{run}/analyze-image/thumbnail.png', 'report.html']),
+    ('analyze-batch', 'exercises/03-imaging-pipeline/tools/analyze-batch.cwl',
+     ['analyze_batch.py', '{image}', '--processes', '1']),
+    ('assess-quality', 'exercises/04-ska-calibration/tools/assess-quality.cwl',
+     ['assess_quality.py', '{image}', 'quality_report.json']),
+]
+
+# Images that once broke the streaming quantiles, run through the tools
+# that compute them: (name, image size, (fill, value of pixel (0, 0)), or
+# None for an image that is 0 in its first half and 1 in its second)
+EDGE_IMAGES = [
+    ('two-valued', 256, None),
+    ('constant-outlier', 256, (1000.0, 1000.5)),
+]
+# analyze-batch is left out: it records failures in its index and exits 0
+EDGE_IMAGE_TOOLS = [tool for tool in IMAGE_TOOLS if tool[0] in ('image-stats', 'analyze-image')]
+
+# Visibility tools run per measurement set in pipeline order.
+# Placeholders: {ms}, {ms_name}, {run}, {image_size}.
+VISIBILITY_TOOLS = [
+    ('flag-data', 'exercises/04-ska-calibration/tools/flag-data.cwl',
+     ['flag_data.py', '{ms}']),
+    ('calibrate-bandpass', 'exercises/04-ska-calibration/tools/calibrate-bandpass.cwl',
+     ['calibrate_bandpass.py', '{run}/flag-data/{ms_name}', '3C286', 'bandpass.json']),
+    ('calibrate-gains', 'exercises/04-ska-calibration/tools/calibrate-gains.cwl',
+     ['calibrate_gains.py', '{run}/flag-data/{ms_name}', '3C286',
+      '{run}/calibrate-bandpass/bandpass.json', 'gains.json', '60']),
+    ('apply-calibration', 'exercises/04-ska-calibration/tools/apply-calibration.cwl',
+     ['apply_calibration.py', '{run}/flag-data/{ms_name}', '{run}/calibrate-bandpass/bandpass.json',
+      '{run}/calibrate-gains/gains.json', 'SKA-J1234+5678']),
+    ('make-image', 'exercises/04-ska-calibration/tools/make-image.cwl',
+     ['make_image.py', '{run}/apply-calibration/calibrated_{ms_name}', 'bench',
+      '{image_size}', '2asec', '1000']),
+]
+
+# Synthetic measurement sets (generate_ms.create_ms arguments) and the
+# image size used to image them
+VISIBILITY_SETS = {
+    'small': ({'n_antennas': 16, 'n_channels': 64}, 512),                  # ~5 MB
+    'medium': ({'n_antennas': 32, 'n_channels': 256, 'n_polarizations': 4,
+                'repeat': 2}, 1024),                                          # ~330 MB
+    'large': ({'n_antennas': 64, 'n_channels': 512, 'n_polarizations': 4,
+               'repeat': 4}, 2048),                                           # ~5 GB
+}
+
+PROFILES = {
+    'small': {'images': [256, 1024], 'visibilities': ['small']},
+    'medium': {'images': [256, 1024, 4096], 'visibilities': ['small', 'medium']},
+    'large': {'images': [256, 1024, 4096, 16384], 'visibilities': ['small', 'medium', 'large']},
+}
+
+
+def load_module(path, name):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def extract_scripts(cwl_path, dest):
+    """Write the literal file entries of a tool's InitialWorkDirRequirement to ``dest``.
+
+    ``$include`` entries are read from the path relative to the tool. Entries
+    computed from CWL expressions are skipped. Returns the names written.
+    """
+    tool_dir = os.path.dirname(os.path.join(ROOT, cwl_path))
+    with open(os.path.join(ROOT, cwl_path)) as f:
+        tool = yaml.safe_load(f)
+    written = []
+    for section in ('requirements', 'hints'):
+        requirements = tool.get(section) or {}
+        if isinstance(requirements, list):
+            requirements = {r.get('class'): r for r in requirements}
+        listing = (requirements.get('InitialWorkDirRequirement') or {}).get('listing', [])
+        for entry in listing:
+            if not isinstance(entry, dict) or 'entryname' not in entry:
+                continue
+            content = entry.get('entry')
+            if isinstance(content, dict) and '$include' in content:
+                with open(os.path.join(tool_dir, content['$include'])) as f:
+                    content = f.read()
+            if not isinstance(content, str) or '$(' in entry['entryname']:
+                continue
+            with open(os.path.join(dest, entry['entryname']), 'w') as f:
+                f.write(content)
+            written.append(entry['entryname'])
+    return written
+
+
+def generate_image(data_dir, size):
+    """Synthetic field of ``size`` x ``size`` pixels, generated once."""
+    path = os.path.join(data_dir, f'image-{size}.fits')
+    if not os.path.exists(path):
+        samples = load_module(os.path.join(ROOT, 'data', 'sample-fits', 'generate_samples.py'),
+                              'generate_samples')
+        n_sources = max(10, size * size // 100000)
+        samples.create_tiled_field(path, size=size, n_sources=n_sources, seed=42,
+                                   tile_size=min(size, 2048))
+    return path
+
+
+def generate_edge_image(data_dir, name, size, values):
+    """One of the EDGE_IMAGES, generated once."""
+    path = os.path.join(data_dir, f'{name}.fits')
+    if not os.path.exists(path):
+        if values is None:
+            data = np.zeros((size, size), dtype=np.float32)
+            data[size // 2:] = 1.0
+        else:
+            data = np.full((size, size), values[0], dtype=np.float32)
+            data[0, 0] = values[1]
+        fits.PrimaryHDU(data).writeto(path)
+    return path
+
+
+def generate_ms(data_dir, name):
+    """Synthetic measurement set ``name`` from VISIBILITY_SETS, generated once."""
+    path = os.path.join(data_dir, f'{name}.ms')
+    if not os.path.exists(os.path.join(path, 'ms_index.json')):
+        generator = load_module(os.path.join(ROOT, 'data', 'measurement-sets', 'generate_ms.py'),
+                                'generate_ms')
+        params = dict(VISIBILITY_SETS[name][0])
+        scans = generator.parse_scans(generator.DEFAULT_SCANS, params.pop('repeat', 1))
+        generator.create_ms(path, scans=scans, **params)
+    return path
+
+
+def read_proc_io(pid):
+    """I/O counters of an exited (not yet reaped) process from /proc, if available."""
+    try:
+        with open(f'/proc/{pid}/io') as f:
+            return {k: int(v) for k, v in (line.split(':') for line in f)}
+    except OSError:
+        return {}
+
+
+def read_peak_rss_kb(pid):
+    """High-water resident set size of a running process, in kB."""
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def run_tool(argv, cwd, timeout):
+    """Run one tool and measure it; the process is reaped only after /proc is read.
+
+    Peak RSS is polled from VmHWM while the tool runs: ru_maxrss of a child
+    starts from the parent's size at fork, so it would include the harness.
+    """
+    with open(os.path.join(cwd, 'output.log'), 'w') as log:
+        start = time.perf_counter()
+        proc = subprocess.Popen([sys.executable] + argv, cwd=cwd, stdout=log, stderr=subprocess.STDOUT)
+        deadline = start + timeout
+        peak_kb = 0
+        while True:
+            # WNOWAIT leaves the process a zombie so its /proc/<pid>/io is still readable
+            info = os.waitid(os.P_PID, proc.pid, os.WEXITED | os.WNOHANG | os.WNOWAIT)
+            if info is not None:
+                break
+            peak_kb = max(peak_kb, read_peak_rss_kb(proc.pid) or 0)
+            if time.perf_counter() > deadline:
+                proc.kill()
+            time.sleep(0.005)
+        wall = time.perf_counter() - start
+        io = read_proc_io(proc.pid)
+        _, status, usage = os.wait4(proc.pid, 0)
+        proc.returncode = os.waitstatus_to_exitcode(status)
+    return {
+        'wall_seconds': round(wall, 4),
+        'cpu_seconds': round(usage.ru_utime + usage.ru_stime, 4),
+        'peak_rss_mb': round(peak_kb / 1024, 1),
+        # Bytes passed through read()/write() calls; memory-mapped access is not counted
+        'read_bytes': io.get('rchar'),
+        'write_bytes': io.get('wchar'),
+        # Bytes actually fetched from or sent to storage, including memmap page faults
+        'storage_read_bytes': io.get('read_bytes'),
+        'storage_write_bytes': io.get('write_bytes'),
+        'exit_code': proc.returncode,
+    }
+
+
+def run_sequence(tools, substitutions, run_dir, input_name, tool_filter, repeat, timeout):
+    """Run ``tools`` in order in per-tool directories under ``run_dir``."""
+    results = []
+    for name, cwl_path, argv in tools:
+        if tool_filter and not re.search(tool_filter, name):
+            continue
+        best = None
+        for _ in range(repeat):
+            cwd = os.path.join(run_dir, name)
+            shutil.rmtree(cwd, ignore_errors=True)
+            os.makedirs(cwd)
+            extract_scripts(cwl_path, cwd)
+            args = [a.format(run=run_dir, **substitutions) for a in argv]
+            measured = run_tool(args, cwd, timeout)
+            # Keep the fastest of the repeats: the least disturbed by other load
+            if best is None or measured['wall_seconds'] < best['wall_seconds']:
+                best = measured
+        status = 'ok' if best['exit_code'] == 0 else 'failed'
+        results.append({'tool': name, 'input': input_name, 'status': status, **best})
+        print(f"  {name:20s} {input_name:12s} {status:6s} {best['wall_seconds']:9.2f} s "
+              f"{best['cpu_seconds']:9.2f} s cpu {best['peak_rss_mb']:8.1f} MB")
+    return results
+
+
+def machine_info():
+    return {
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def run_benchmarks(profile, data_dir, work_dir, tool_filter=None, repeat=1, timeout=3600):
+    os.makedirs(data_dir, exist_ok=True)
+    results = []
+    for size in PROFILES[profile]['images']:
+        image = generate_image(data_dir, size)
+        print(f"Image {size}x{size}:")
+        results += run_sequence(IMAGE_TOOLS, {'image': image},
+                                os.path.join(work_dir, f'image-{size}'), f'{size}px',
+                                tool_filter, repeat, timeout)
+    for name, size, values in EDGE_IMAGES:
+        image = generate_edge_image(data_dir, name, size, values)
+        print(f"Image {name}:")
+        results += run_sequence(EDGE_IMAGE_TOOLS, {'image': image},
+                                os.path.join(work_dir, f'image-{name}'), name,
+                                tool_filter, repeat, timeout)
+    for name in PROFILES[profile]['visibilities']:
+        ms = generate_ms(data_dir, name)
+        print(f"Visibilities '{name}':")
+        substitutions = {'ms': ms, 'ms_name': os.path.basename(ms),
+                         'image_size': VISIBILITY_SETS[name][1]}
+        results += run_sequence(VISIBILITY_TOOLS, substitutions,
+                                os.path.join(work_dir, f'vis-{name}'), f'{name}-ms',
+                                tool_filter, repeat, timeout)
+    return {
+        'profile': profile,
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'machine': machine_info(),
+        'repeat': repeat,
+        'results': results,
+    }
+
+
+def compare(current, baseline, threshold, rss_threshold, min_seconds):
+    """Regressions of ``current`` against ``baseline`` as a list of messages."""
+    reference = {(r['tool'], r['input']): r for r in baseline['results']}
+    regressions = []
+    for result in current['results']:
+        key = (result['tool'], result['input'])
+        base = reference.get(key)
+        if base is None:
+            continue
+        label = f"{key[0]} on {key[1]}"
+        if result['status'] != 'ok':
+            if base['status'] == 'ok':
+                regressions.append(f"{label}: now fails (exit code {result['exit_code']})")
+            continue
+        if base['status'] != 'ok':
+            continue
+        # Absolute slack keeps start-up jitter of very short runs from counting
+        slower = result['wall_seconds'] - base['wall_seconds']
+        if slower > min_seconds and result['wall_seconds'] > base['wall_seconds'] * (1 + threshold):
+            regressions.append(f"{label}: {result['wall_seconds']:.2f} s vs {base['wall_seconds']:.2f} s "
+                               f"(+{100 * slower / base['wall_seconds']:.0f}%)")
+        if rss_threshold is not None and result['peak_rss_mb'] > base['peak_rss_mb'] * (1 + rss_threshold):
+            regressions.append(f"{label}: peak RSS {result['peak_rss_mb']:.0f} MB vs "
+                               f"{base['peak_rss_mb']:.0f} MB")
+    return regressions
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--profile', choices=sorted(PROFILES), default='small',
+                        help='Input sizes: small (up to 1024^2), medium (4096^2), large (16384^2, ~5 GB MS)')
+    parser.add_argument('--tools',
+                        help='Only run tools whose name matches this regular expression')
+    parser.add_argument('--repeat', type=int, default=1,
+                        help='Run each tool this many times and keep the fastest')
+    parser.add_argument('--timeout', type=float, default=3600,
+                        help='Seconds before a tool is killed')
+    parser.add_argument('--data-dir', default=os.path.join(BENCH_DIR, 'data'),
+                        help='Where generated inputs are kept between runs')
+    parser.add_argument('--work-dir', default=os.path.join(BENCH_DIR, 'work'),
+                        help='Where tools run')
+    parser.add_argument('--output',
+                        help='Results file (default: benchmarks/results/<profile>-<time>.json)')
+    parser.add_argument('--baseline',
+                        help='Baseline to compare with (default: baselines/<profile>.json)')
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='Save the results as the baseline instead of comparing')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='Flag tools slower than the baseline by more than this fraction')
+    parser.add_argument('--rss-threshold', type=float, default=0.25,
+                        help='Flag tools whose peak RSS grew by more than this fraction (negative disables)')
+    parser.add_argument('--min-seconds', type=float, default=0.2,
+                        help='Ignore slowdowns smaller than this many seconds')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    current = run_benchmarks(args.profile, args.data_dir, args.work_dir,
+                             args.tools, args.repeat, args.timeout)
+
+    output = args.output or os.path.join(
+        BENCH_DIR, 'results', f"{args.profile}-{datetime.now():%Y%m%d-%H%M%S}.json")
+    baseline_path = args.baseline or os.path.join(BASELINE_DIR, f'{args.profile}.json')
+    if args.save_baseline:
+        output = baseline_path
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(current, f, indent=2)
+    print(f"Results: {output}")
+
+    if args.save_baseline:
+        sys.exit(0)
+    if not os.path.exists(baseline_path):
+        print(f"No baseline at {baseline_path}; run with --save-baseline to create one")
+        sys.exit(0)
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    rss_threshold = args.rss_threshold if args.rss_threshold >= 0 else None
+    regressions = compare(current, baseline, args.threshold, rss_threshold, args.min_seconds)
+    if baseline['machine'] != current['machine']:
+        print("Note: the baseline was recorded on a different machine or software stack")
+    for message in regressions:
+        print(f"REGRESSION {message}")
+    print(f"{len(regressions)} regressions against {baseline_path} (threshold {args.threshold:.0%})")
+    sys.exit(1 if regressions else 0)
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""Generate a synthetic measurement set for load-testing the calibration pipeline.
+
+This is a command-line front end to ``simulate_ms`` in the Exercise 4
+``ms_io.py``, the same simulator that fills the workshop's placeholder
+measurement set. The output uses the NumPy layout read by the Exercise 4
+tools: one memory-mappable ``.npy`` file per column plus a small
+``ms_index.json``. Visibilities are a point-source sky corrupted by
+per-antenna gains and bandpasses, with thermal noise and injected RFI.
+Rows are written in blocks of whole integrations, so memory is bounded
+by the block size whatever the size of the dataset, e.g. for about 60 GB::
+
+    python generate_ms.py --output large.ms --antennas 64 --channels 1024 \\
+        --polarizations 4 --repeat 10 --workers 4
+
+Noise is drawn per integration from ``seed``, so the output does not
+depend on the block size or the number of workers.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', '..', 'exercises', '04-ska-calibration', 'lib'))
+import ms_io  # noqa: E402
+
+DEFAULT_SCANS = '3C286:10,SKA-J1234+5678:30'
+
+
+def parse_scans(spec, repeat=1):
+    """Parse 'FIELD:N,FIELD:N' into (field, integrations) pairs, repeated."""
+    scans = []
+    for item in spec.split(','):
+        name, _, count = item.rpartition(':')
+        if not name or not count.isdigit() or int(count) < 1:
+            raise SystemExit(f"Bad scan {item!r}: expected FIELD:INTEGRATIONS")
+        scans.append((name, int(count)))
+    return scans * repeat
+
+
+def create_ms(output, n_antennas=16, n_channels=512, n_polarizations=2, scans=None,
+              integration_time=10.0, freq_start_hz=1.3e9, channel_width_hz=200e3,
+              noise_jy=0.5, n_sources=5, rfi_level=5.0, max_baseline_m=4000.0,
+              block_mb=64, workers=1, seed=2025):
+    """Write a synthetic measurement set to ``output`` block by block."""
+    start = time.time()
+
+    def progress(index, done, total, written):
+        if done == 0:
+            total_bytes = sum(os.path.getsize(ms_io.column_path(output, name)) for name in index['columns'])
+            print(f"Writing {output}: {index['n_rows']} rows, {n_channels} channels, "
+                  f"{n_polarizations} polarizations, {total_bytes / 1e9:.2f} GB in {total} blocks")
+        else:
+            report_progress(done, total, written, start)
+
+    index = ms_io.simulate_ms(output, n_antennas=n_antennas, n_channels=n_channels,
+                              n_polarizations=n_polarizations, scans=scans or parse_scans(DEFAULT_SCANS),
+                              integration_time=integration_time, freq_start_hz=freq_start_hz,
+                              channel_width_hz=channel_width_hz, noise_jy=noise_jy,
+                              n_sources=n_sources, rfi_level=rfi_level, max_baseline_m=max_baseline_m,
+                              block_mb=block_mb, workers=workers, seed=seed, progress=progress)
+    elapsed = time.time() - start
+    data_bytes = os.path.getsize(ms_io.column_path(output, 'DATA'))
+    print(f"Created: {output} ({data_bytes / 1e6:.0f} MB of visibilities in {elapsed:.1f} s, "
+          f"{len(index['simulation']['rfi'])} RFI events)")
+    return index
+
+
+def report_progress(done, total, written, start):
+    if done == total or done % max(1, total // 20) == 0:
+        rate = written / 1e6 / max(time.time() - start, 1e-9)
+        print(f"  block {done}/{total}: {written / 1e6:.0f} MB ({rate:.0f} MB/s)")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--output', default='synthetic.ms',
+                        help='Measurement set directory to write')
+    parser.add_argument('--antennas', type=int, default=16,
+                        help='Number of antennas')
+    parser.add_argument('--channels', type=int, default=512,
+                        help='Number of frequency channels')
+    parser.add_argument('--polarizations', type=int, default=2, choices=sorted(ms_io.CORRELATIONS),
+                        help='Correlation products (XX; XX YY; or XX XY YX YY)')
+    parser.add_argument('--scans', default=DEFAULT_SCANS,
+                        help='Scan sequence as FIELD:INTEGRATIONS pairs; the first field is the calibrator')
+    parser.add_argument('--repeat', type=int, default=1,
+                        help='Repeat the scan sequence this many times')
+    parser.add_argument('--integration-time', type=float, default=10.0,
+                        help='Integration time in seconds')
+    parser.add_argument('--freq-start', type=float, default=1.3e9,
+                        help='Frequency of the first channel in Hz')
+    parser.add_argument('--channel-width', type=float, default=200e3,
+                        help='Channel width in Hz')
+    parser.add_argument('--noise', type=float, default=0.5,
+                        help='Thermal noise per visibility in Jy')
+    parser.add_argument('--n-sources', type=int, default=5,
+                        help='Point sources per target field')
+    parser.add_argument('--rfi-level', type=float, default=5.0,
+                        help='RFI strength in units of the noise (0 disables RFI)')
+    parser.add_argument('--max-baseline', type=float, default=4000.0,
+                        help='Approximate longest baseline in metres')
+    parser.add_argument('--block-mb', type=float, default=64,
+                        help='Visibility data simulated per block, in MB')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Simulate blocks in this many processes')
+    parser.add_argument('--seed', type=int, default=2025,
+                        help='Random seed for the layout, sky, corruptions and noise')
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    create_ms(args.output, n_antennas=args.antennas, n_channels=args.channels,
+              n_polarizations=args.polarizations, scans=parse_scans(args.scans, args.repeat),
+              integration_time=args.integration_time, freq_start_hz=args.freq_start,
+              channel_width_hz=args.channel_width, noise_jy=args.noise,
+              n_sources=args.n_sources, rfi_level=args.rfi_level,
+              max_baseline_m=args.max_baseline, block_mb=args.block_mb,
+              workers=args.workers, seed=args.seed)
@@ -1,40 +1,141 @@
 #!/usr/bin/env python3
-"""Generate sample FITS files for workshop exercises."""
+"""Generate sample FITS files for workshop exercises.
 
+Run without arguments to regenerate the small workshop files. Use
+``--tiled`` to generate a large synthetic field for load testing, e.g.::
+
+    python generate_samples.py --tiled --size 16384 --n-sources 5000 \\
+        --seed 7 --output load-test.fits
+
+or ``--cube`` to generate a spectral cube (``sample-cube.fits``)::
+
+    python generate_samples.py --cube --channels 64 --stokes 4
+
+Add ``--compression rice`` (quantized, lossy) or ``--compression gzip``
+(lossless) to either to write a tile-compressed float32 image.
+
+``--pointings N`` generates N overlapping pointings of one patch of sky
+(``pointing-00.fits``, ...) with different noise levels, for mosaicking::
+
+    python generate_samples.py --pointings 4
+"""
+
+import argparse
+import csv
+import io
 import numpy as np
 from astropy.io import fits
 from astropy.wcs import WCS
 import os
+import re
+import shutil
+import tempfile
 
-def create_sample_observation():
-    """Create a sample observation FITS file."""
-    
-    # Create image data - simulated galaxy field
-    size = 512
-    image = np.random.randn(size, size) * 0.001  # Background noise
-    
-    # Add some simulated sources
-    np.random.seed(42)
-    for _ in range(20):
-        x = np.random.randint(50, size-50)
-        y = np.random.randint(50, size-50)
-        flux = np.random.exponential(0.05)
-        sigma = np.random.uniform(3, 8)
-        
-        yy, xx = np.ogrid[:size, :size]
-        gaussian = flux * np.exp(-((xx-x)**2 + (yy-y)**2) / (2*sigma**2))
-        image += gaussian
-    
-    # Create WCS
+# Sources are injected as stamps truncated at this many sigma
+STAMP_TRUNCATE = 5.0
+# Number of sources whose stamps are evaluated together in one array
+SOURCE_BATCH = 256
+# Tile compression codecs: rice quantizes the floats (lossy, smallest),
+# gzip compresses their bits losslessly
+COMPRESSION = {'rice': 'RICE_1', 'gzip': 'GZIP_2'}
+# Edge of the square compression tiles, so readers can decompress regions
+COMPRESSION_TILE = 256
+# Dither seed (ZDITHER0) of the first compressed tile
+DITHER_SEED = 1
+
+
+def make_catalogue(rng, size, n_sources, flux_scale=0.05,
+                   sigma_range=(3.0, 8.0), margin=50):
+    """Draw a reproducible source catalogue.
+
+    Returns a dict of equal-length arrays: x, y (pixel centres), flux
+    (peak, Jy/beam) and sigma (Gaussian width in pixels).
+    """
+    margin = min(margin, size // 4)
+    return {
+        'x': rng.integers(margin, size - margin, n_sources).astype(np.float64),
+        'y': rng.integers(margin, size - margin, n_sources).astype(np.float64),
+        'flux': rng.exponential(flux_scale, n_sources),
+        'sigma': rng.uniform(sigma_range[0], sigma_range[1], n_sources),
+    }
+
+
+def read_catalogue(path):
+    """Read a catalogue CSV with x, y, flux, sigma columns."""
+    with open(path, newline='') as f:
+        rows = list(csv.DictReader(f))
+    return {k: np.array([float(r[k]) for r in rows])
+            for k in ('x', 'y', 'flux', 'sigma')}
+
+
+def write_catalogue(catalogue, path):
+    """Write a catalogue as CSV so the injected sky can be checked later."""
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['x', 'y', 'flux', 'sigma'])
+        writer.writerows(zip(catalogue['x'], catalogue['y'],
+                             catalogue['flux'], catalogue['sigma']))
+
+
+def inject_sources(tile, y0, x0, catalogue, truncate=STAMP_TRUNCATE):
+    """Add Gaussian sources to ``tile`` whose origin is pixel (y0, x0).
+
+    Each source only touches a stamp of radius ``truncate * sigma``, and
+    stamps are evaluated in batches, so the cost is proportional to the
+    number of stamp pixels rather than sources x image pixels.
+    """
+    ny, nx = tile.shape
+    radius = np.ceil(truncate * catalogue['sigma']).astype(np.int64)
+    xi = np.round(catalogue['x']).astype(np.int64)
+    yi = np.round(catalogue['y']).astype(np.int64)
+
+    # Keep only sources whose stamp overlaps this tile
+    hit = ((xi + radius >= x0) & (xi - radius < x0 + nx) &
+           (yi + radius >= y0) & (yi - radius < y0 + ny))
+    idx = np.flatnonzero(hit)
+    if idx.size == 0:
+        return tile
+
+    # Sorting by radius keeps the padded stamp size small within a batch
+    idx = idx[np.argsort(radius[idx], kind='stable')]
+    flat = np.zeros(tile.size, dtype=np.float64)
+
+    for start in range(0, idx.size, SOURCE_BATCH):
+        batch = idx[start:start + SOURCE_BATCH]
+        r = int(radius[batch].max())
+        offsets = np.arange(-r, r + 1)
+
+        # (n, stamp, 1) and (n, 1, stamp) pixel coordinates in the full image
+        py = (yi[batch, None] + offsets)[:, :, None]
+        px = (xi[batch, None] + offsets)[:, None, :]
+        dx = px - catalogue['x'][batch, None, None]
+        dy = py - catalogue['y'][batch, None, None]
+        sig = catalogue['sigma'][batch, None, None]
+        values = catalogue['flux'][batch, None, None] * np.exp(
+            -(dx * dx + dy * dy) / (2 * sig * sig))
+
+        ty = py - y0
+        tx = px - x0
+        inside = ((ty >= 0) & (ty < ny) & (tx >= 0) & (tx < nx) &
+                  (dx * dx + dy * dy <= (truncate * sig) ** 2))
+        flat_index = np.broadcast_to(ty * nx + tx, values.shape)[inside]
+        flat += np.bincount(flat_index, weights=values[inside],
+                            minlength=tile.size)
+
+    tile += flat.reshape(ny, nx).astype(tile.dtype, copy=False)
+    return tile
+
+
+def observation_header(size, object_name='Workshop Sample Field'):
+    """Build the TAN header used for sample observations."""
     wcs = WCS(naxis=2)
     wcs.wcs.crpix = [size/2, size/2]
     wcs.wcs.cdelt = [-0.001, 0.001]  # 3.6 arcsec pixels
     wcs.wcs.crval = [180.0, 45.0]  # RA, Dec
     wcs.wcs.ctype = ["RA---TAN", "DEC--TAN"]
-    
-    # Create header
+
     header = wcs.to_header()
-    header['OBJECT'] = 'Workshop Sample Field'
+    header['OBJECT'] = object_name
     header['TELESCOP'] = 'SKA-MID'
     header['INSTRUME'] = 'Band 2'
     header['DATE-OBS'] = '2025-01-15T12:00:00'
@@ -45,27 +146,42 @@ def create_sample_observation():
     header['BPA'] = 45.0
     header['FREQ'] = 1.4e9
     header['OBSERVER'] = 'CWL Workshop'
-    
+    return header
+
+
+def create_sample_observation(seed=42):
+    """Create a sample observation FITS file."""
+    rng = np.random.default_rng(seed)
+
+    # Create image data - simulated galaxy field
+    size = 512
+    image = rng.standard_normal((size, size), dtype=np.float32) * 0.001  # Background noise
+
+    # Add some simulated sources
+    catalogue = make_catalogue(rng, size, 20)
+    inject_sources(image, 0, 0, catalogue)
+
     # Create HDU and write
-    hdu = fits.PrimaryHDU(data=image.astype(np.float32), header=header)
-    
+    hdu = fits.PrimaryHDU(data=image, header=observation_header(size))
+
     output_dir = os.path.dirname(os.path.abspath(__file__))
     output_path = os.path.join(output_dir, 'observation.fits')
     hdu.writeto(output_path, overwrite=True)
     print(f"Created: {output_path}")
 
-def create_calibrator_fits():
+def create_calibrator_fits(seed=42):
     """Create a calibrator source FITS file."""
-    
+    rng = np.random.default_rng(seed)
+
     size = 256
-    image = np.random.randn(size, size) * 0.0005
-    
+    image = rng.standard_normal((size, size), dtype=np.float32) * 0.0005
+
     # Add bright point source at center
-    yy, xx = np.ogrid[:size, :size]
     center = size / 2
-    gaussian = 1.0 * np.exp(-((xx-center)**2 + (yy-center)**2) / (2*5**2))
-    image += gaussian
-    
+    catalogue = {'x': np.array([center]), 'y': np.array([center]),
+                 'flux': np.array([1.0]), 'sigma': np.array([5.0])}
+    inject_sources(image, 0, 0, catalogue)
+
     header = fits.Header()
     header['OBJECT'] = '3C286'
     header['TELESCOP'] = 'SKA-MID'
@@ -73,16 +189,338 @@ def create_calibrator_fits():
     header['EXPTIME'] = 600.0
     header['BUNIT'] = 'JY/BEAM'
     header['COMMENT'] = 'Calibrator observation for CWL workshop'
-    
-    hdu = fits.PrimaryHDU(data=image.astype(np.float32), header=header)
-    
+
+    hdu = fits.PrimaryHDU(data=image, header=header)
+
     output_dir = os.path.dirname(os.path.abspath(__file__))
     output_path = os.path.join(output_dir, 'calibrator.fits')
     hdu.writeto(output_path, overwrite=True)
     print(f"Created: {output_path}")
 
+
+def allocate_fits(output_path, header, shape, dtype=np.float32):
+    """Write ``header`` and reserve space for the data without building it.
+
+    Returns the byte offset of the data section within the file.
+    """
+    primary = fits.PrimaryHDU(data=np.zeros((1,) * len(shape), dtype=dtype), header=header)
+    header = primary.header
+    for axis, n in enumerate(reversed(shape), start=1):
+        header[f'NAXIS{axis}'] = n
+    header.tofile(output_path, overwrite=True)
+
+    header_bytes = os.path.getsize(output_path)
+    data_bytes = int(np.prod(shape)) * np.dtype(dtype).itemsize
+    padded = -(-data_bytes // 2880) * 2880
+    with open(output_path, 'r+b') as f:
+        f.seek(header_bytes + padded - 1)
+        f.write(b'\0')
+    return header_bytes
+
+
+def compress_strip(data, header, compression, tile, quantize_level, dither_seed):
+    """Tile-compress one strip of whole tile rows.
+
+    Returns the compressed binary table header, its rows and its heap.
+    """
+    hdu = fits.CompImageHDU(data=data, header=header,
+                            compression_type=COMPRESSION[compression], tile_shape=tile,
+                            quantize_level=quantize_level if compression == 'rice' else 0.0,
+                            quantize_method=fits.hdu.compressed.SUBTRACTIVE_DITHER_1,
+                            dither_seed=dither_seed)
+    buf = io.BytesIO()
+    fits.HDUList([fits.PrimaryHDU(), hdu]).writeto(buf)
+    raw = buf.getvalue()
+    with fits.open(io.BytesIO(raw), disable_image_compression=True) as hdul:
+        table = hdul[1]
+        start = table.fileinfo()['datLoc']
+        header, dtype = table.header.copy(), table.columns.dtype.newbyteorder('>')
+    end = start + header['NAXIS1'] * header['NAXIS2']
+    return header, np.frombuffer(raw[start:end], dtype=dtype).copy(), raw[end:end + header['PCOUNT']]
+
+
+def compress_fits(input_path, output_path, compression, quantize_level=16.0,
+                  tile_size=COMPRESSION_TILE):
+    """Write the primary image of ``input_path`` as a tile-compressed float32 image.
+
+    The compressed image is the first extension after an empty primary HDU.
+    Planes of a cube are separate tiles. With 'rice', floats are quantized
+    to ``quantize_level`` levels per noise sigma with subtractive
+    dithering; 'gzip' keeps every bit.
+
+    The image is compressed one strip of tile rows at a time, so memory
+    holds one strip and the table of tile descriptors, while the
+    compressed tiles are spooled to a temporary file. The dither sequence
+    continues across strips as if the image were compressed in one go.
+    """
+    with fits.open(input_path, memmap=False) as hdul:
+        # Strips are read from the file one at a time, so the pages of
+        # strips already compressed are not kept mapped
+        shape = hdul[0].shape
+        tile = (1,) * (len(shape) - 2) + tuple(min(tile_size, n) for n in shape[-2:])
+        n_tiles, heap_size = 0, 0
+        header, rows = None, []
+        with tempfile.TemporaryFile(dir=os.path.dirname(os.path.abspath(output_path))) as heap:
+            for plane in np.ndindex(shape[:-2]):
+                for y0 in range(0, shape[-2], tile[-2]):
+                    # Converted to native float32 one strip at a time, never as a whole
+                    strip = np.asarray(hdul[0].section[plane + (slice(y0, y0 + tile[-2]),)][(None,) * len(plane)],
+                                       dtype=np.float32)
+                    strip_header, strip_rows, strip_heap = compress_strip(
+                        strip, hdul[0].header, compression, tile, quantize_level,
+                        (DITHER_SEED - 1 + n_tiles) % 10000 + 1)
+                    for name in strip_rows.dtype.names:
+                        if strip_rows.dtype[name].shape == (2,):
+                            # Variable-length array descriptors: (length, heap offset)
+                            descriptors = strip_rows[name]
+                            descriptors[descriptors[:, 0] > 0, 1] += heap_size
+                    heap.write(strip_heap)
+                    heap_size += len(strip_heap)
+                    n_tiles += strip_rows.size
+                    rows.append(strip_rows)
+                    if header is None:
+                        header = strip_header
+                    if 'ZBLANK' in strip_header:
+                        header['ZBLANK'] = strip_header['ZBLANK']
+            if heap_size >= 2 ** 31:
+                raise ValueError(f"{input_path}: compressed tiles exceed the 2 GB heap of a FITS table")
+            rows = np.concatenate(rows)
+
+            # The first strip's header describes the whole image once the
+            # image shape, tile count, heap size and longest tile are set
+            for axis, n in enumerate(reversed(shape), start=1):
+                header[f'ZNAXIS{axis}'] = n
+            header['ZDITHER0'] = DITHER_SEED
+            header['NAXIS2'] = n_tiles
+            header['PCOUNT'] = heap_size
+            for i, name in enumerate(rows.dtype.names, start=1):
+                if rows.dtype[name].shape == (2,):
+                    header[f'TFORM{i}'] = re.sub(r'\(\d+\)', f'({rows[name][:, 0].max()})', header[f'TFORM{i}'])
+
+            with open(output_path, 'wb') as f:
+                fits.PrimaryHDU().writeto(f)
+                f.write(header.tostring().encode('ascii'))
+                f.write(rows.astype(rows.dtype.newbyteorder('>')).tobytes())
+                heap.seek(0)
+                shutil.copyfileobj(heap, f)
+                f.write(b'\0' * (-(rows.nbytes + heap_size) % 2880))
+
+
+def compress_in_place(path, compression, quantize_level):
+    """Replace an uncompressed FITS file by its tile-compressed version."""
+    compressed = path + '.compressing'
+    compress_fits(path, compressed, compression, quantize_level)
+    os.replace(compressed, path)
+    print(f"Compressed with {compression}: {path} ({os.path.getsize(path)} bytes)")
+
+
+def create_tiled_field(output_path, size=16384, n_sources=2000, seed=42,
+                       tile_size=2048, noise=0.001, catalogue=None,
+                       flux_scale=0.05, sigma_range=(3.0, 8.0),
+                       compression=None, quantize_level=16.0):
+    """Generate a large synthetic field tile by tile into a memmapped FITS.
+
+    Peak memory is a few tiles: each tile gets its own noise stream derived
+    from ``seed`` and its tile index, so the output is reproducible and
+    independent of the order tiles are written in. With ``compression``
+    the finished file is rewritten tile-compressed (see ``compress_fits``).
+    """
+    rng = np.random.default_rng(seed)
+    if catalogue is None:
+        catalogue = make_catalogue(rng, size, n_sources,
+                                   flux_scale=flux_scale,
+                                   sigma_range=sigma_range)
+
+    header = observation_header(size, object_name='Synthetic Load-Test Field')
+    header['NSOURCES'] = (len(catalogue['x']), 'Injected sources')
+    header['SIMSEED'] = (seed, 'Random seed used for the simulation')
+    offset = allocate_fits(output_path, header, (size, size))
+    dtype = np.dtype('>f4')
+
+    for y0 in range(0, size, tile_size):
+        # Map one band of tile rows at a time so resident pages stay bounded
+        ny = min(tile_size, size - y0)
+        data = np.memmap(output_path, dtype=dtype, mode='r+',
+                         offset=offset + y0 * size * dtype.itemsize,
+                         shape=(ny, size))
+        for x0 in range(0, size, tile_size):
+            nx = min(tile_size, size - x0)
+            tile_rng = np.random.default_rng([seed, y0 // tile_size, x0 // tile_size])
+            tile = tile_rng.standard_normal((ny, nx), dtype=np.float32) * noise
+            inject_sources(tile, y0, x0, catalogue)
+            data[:, x0:x0 + nx] = tile
+        data.flush()
+        del data
+
+    catalogue_path = os.path.splitext(output_path)[0] + '-catalogue.csv'
+    write_catalogue(catalogue, catalogue_path)
+    print(f"Created: {output_path} ({size}x{size}, {len(catalogue['x'])} sources)")
+    print(f"Catalogue: {catalogue_path}")
+    if compression:
+        compress_in_place(output_path, compression, quantize_level)
+
+
+def create_cube(output_path, size=256, n_channels=64, n_stokes=1, n_sources=30,
+                seed=42, noise=0.001, bad_channels=(), freq0=1.4e9, channel_width=1e6,
+                compression=None, quantize_level=16.0):
+    """Generate a spectral (and optionally Stokes) cube plane by plane.
+
+    Sources have a power-law continuum and half of them a Gaussian
+    spectral line; Q, U and V are small fractions of I. Channels in
+    ``bad_channels`` get ten times the noise, as if hit by RFI. Only one
+    plane is held in memory at a time.
+    """
+    rng = np.random.default_rng(seed)
+    catalogue = make_catalogue(rng, size, n_sources)
+    spectral_index = rng.normal(-0.7, 0.2, n_sources)
+    line_flux = np.where(rng.random(n_sources) < 0.5, rng.exponential(0.05, n_sources), 0.0)
+    line_centre = rng.uniform(0.2, 0.8, n_sources) * n_channels
+    line_width = rng.uniform(1.0, 4.0, n_sources)
+    pol_fraction = {1: 1.0, 2: 0.05, 3: -0.03, 4: 0.01}
+
+    wcs = WCS(naxis=4)
+    wcs.wcs.crpix = [size/2, size/2, 1, 1]
+    wcs.wcs.cdelt = [-0.001, 0.001, channel_width, 1]
+    wcs.wcs.crval = [180.0, 45.0, freq0, 1]  # Stokes I first
+    wcs.wcs.ctype = ["RA---SIN", "DEC--SIN", "FREQ", "STOKES"]
+    wcs.wcs.cunit = ["deg", "deg", "Hz", ""]
+    header = observation_header(size, object_name='Synthetic Spectral Cube')
+    header.update(wcs.to_header())
+    header['NSOURCES'] = (n_sources, 'Injected sources')
+    header['SIMSEED'] = (seed, 'Random seed used for the simulation')
+    shape = (n_stokes, n_channels, size, size)
+    offset = allocate_fits(output_path, header, shape)
+    dtype = np.dtype('>f4')
+
+    for s in range(n_stokes):
+        for c in range(n_channels):
+            freq = freq0 + c * channel_width
+            plane_rng = np.random.default_rng([seed, s, c])
+            sigma = noise * (10 if c in bad_channels else 1)
+            plane = plane_rng.standard_normal((size, size), dtype=np.float32) * sigma
+            flux = catalogue['flux'] * (freq / freq0) ** spectral_index
+            flux += line_flux * np.exp(-0.5 * ((c - line_centre) / line_width) ** 2)
+            inject_sources(plane, 0, 0, dict(catalogue, flux=flux * pol_fraction[s + 1]))
+            index = s * n_channels + c
+            data = np.memmap(output_path, dtype=dtype, mode='r+',
+                             offset=offset + index * size * size * dtype.itemsize,
+                             shape=(size, size))
+            data[:] = plane
+            data.flush()
+            del data
+
+    print(f"Created: {output_path} ({n_stokes} Stokes x {n_channels} channels x {size}x{size})")
+    if compression:
+        compress_in_place(output_path, compression, quantize_level)
+
+
+def create_pointings(prefix='pointing', n_pointings=4, size=512, n_sources=60,
+                     seed=42, noise=0.001, overlap=0.25):
+    """Generate overlapping pointings of one sky, as inputs for a mosaic.
+
+    The pointings form a grid whose neighbours overlap by ``overlap`` of
+    their width; each has its own TAN projection centred on its pointing
+    and its own noise level (0.5 to 2 times ``noise``). Sources are drawn
+    once on a sky grid covering all pointings and injected into each
+    pointing at their sky position, so they line up across the mosaic.
+    The catalogue CSV gives their positions on that sky grid.
+    """
+    rng = np.random.default_rng(seed)
+    n_cols = int(np.ceil(np.sqrt(n_pointings)))
+    step = int(size * (1 - overlap))
+    sky_size = size + (n_cols - 1) * step
+    catalogue = make_catalogue(rng, sky_size, n_sources)
+    sky = WCS(observation_header(sky_size))
+    ra, dec = sky.pixel_to_world_values(catalogue['x'], catalogue['y'])
+    noise_levels = noise * rng.uniform(0.5, 2.0, n_pointings)
+
+    for i in range(n_pointings):
+        # Pointing centre on the sky grid, in pixel coordinates
+        cx = (i % n_cols) * step + size / 2
+        cy = (i // n_cols) * step + size / 2
+        header = observation_header(size, object_name=f'Mosaic Pointing {i}')
+        header['CRVAL1'], header['CRVAL2'] = (float(v) for v in sky.pixel_to_world_values(cx, cy))
+        header['NOISE'] = (float(noise_levels[i]), 'Injected noise RMS (Jy/beam)')
+        header['SIMSEED'] = (seed, 'Random seed used for the simulation')
+        x, y = WCS(header).world_to_pixel_values(ra, dec)
+        image = np.random.default_rng([seed, i]).standard_normal((size, size), dtype=np.float32)
+        image *= noise_levels[i]
+        inject_sources(image, 0, 0, dict(catalogue, x=x, y=y))
+        output_path = f'{prefix}-{i:02d}.fits'
+        fits.PrimaryHDU(data=image, header=header).writeto(output_path, overwrite=True)
+        print(f"Created: {output_path} ({size}x{size}, noise {noise_levels[i]:.4f})")
+
+    catalogue_path = f'{prefix}-catalogue.csv'
+    write_catalogue(catalogue, catalogue_path)
+    print(f"Catalogue: {catalogue_path} ({sky_size}x{sky_size} sky grid)")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tiled', action='store_true',
+                        help='Generate one large synthetic field instead of the workshop samples')
+    parser.add_argument('--cube', action='store_true',
+                        help='Generate a spectral cube instead of the workshop samples')
+    parser.add_argument('--pointings', type=int, default=None, metavar='N',
+                        help='Generate N overlapping pointings for a mosaic instead of the workshop samples')
+    parser.add_argument('--output', default=None,
+                        help='Output path for --tiled (synthetic-field.fits) or --cube (sample-cube.fits), '
+                             'or file prefix for --pointings (pointing)')
+    parser.add_argument('--size', type=int, default=None,
+                        help='Image size in pixels (square; default 16384, 256 with --cube, 512 with --pointings)')
+    parser.add_argument('--n-sources', type=int, default=None,
+                        help='Number of sources to draw when no catalogue is given '
+                             '(default 2000, 30 with --cube, 60 with --pointings)')
+    parser.add_argument('--seed', type=int, default=42,
+                        help='Random seed for the catalogue and noise')
+    parser.add_argument('--tile-size', type=int, default=2048,
+                        help='Tile edge length in pixels')
+    parser.add_argument('--noise', type=float, default=0.001,
+                        help='Background noise RMS in Jy/beam')
+    parser.add_argument('--flux-scale', type=float, default=0.05,
+                        help='Mean of the exponential peak flux distribution')
+    parser.add_argument('--sigma-range', type=float, nargs=2, default=(3.0, 8.0),
+                        metavar=('MIN', 'MAX'),
+                        help='Range of source widths in pixels')
+    parser.add_argument('--channels', type=int, default=64,
+                        help='Number of frequency channels for --cube')
+    parser.add_argument('--stokes', type=int, default=1, choices=[1, 2, 3, 4],
+                        help='Number of Stokes planes (I, Q, U, V) for --cube')
+    parser.add_argument('--bad-channels', type=int, nargs='*', default=[10, 11, 40],
+                        help='Channels with ten times the noise for --cube')
+    parser.add_argument('--compression', choices=sorted(COMPRESSION),
+                        help='Tile-compress the --tiled or --cube output: rice (lossy) or gzip (lossless)')
+    parser.add_argument('--quantize-level', type=float, default=16.0,
+                        help='Quantization levels per noise sigma for rice compression')
+    parser.add_argument('--catalogue',
+                        help='CSV with x, y, flux, sigma columns to inject instead of random sources')
+    return parser.parse_args()
+
+
 if __name__ == "__main__":
-    print("Generating sample FITS files...")
-    create_sample_observation()
-    create_calibrator_fits()
-    print("Done!")
+    args = parse_args()
+    if args.cube:
+        create_cube(args.output or 'sample-cube.fits', size=args.size or 256,
+                    n_channels=args.channels, n_stokes=args.stokes,
+                    n_sources=args.n_sources or 30, seed=args.seed,
+                    noise=args.noise, bad_channels=set(args.bad_channels),
+                    compression=args.compression, quantize_level=args.quantize_level)
+    elif args.pointings:
+        create_pointings(args.output or 'pointing', n_pointings=args.pointings,
+                         size=args.size or 512, n_sources=args.n_sources or 60,
+                         seed=args.seed, noise=args.noise)
+    elif args.tiled:
+        catalogue = read_catalogue(args.catalogue) if args.catalogue else None
+        create_tiled_field(args.output or 'synthetic-field.fits', size=args.size or 16384,
+                           n_sources=args.n_sources or 2000,
+                           seed=args.seed, tile_size=args.tile_size,
+                           noise=args.noise, catalogue=catalogue,
+                           flux_scale=args.flux_scale,
+                           sigma_range=tuple(args.sigma_range),
+                           compression=args.compression,
+                           quantize_level=args.quantize_level)
+    else:
+        print("Generating sample FITS files...")
+        create_sample_observation()
+        create_calibrator_fits()
+        print("Done!")
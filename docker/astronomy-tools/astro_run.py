@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""Run a tool script in the astronomy-tools worker, or in this process.
+
+Usage: astro-run <script> [args...]
+
+If astro-worker is listening on ASTRO_WORKER_SOCKET (default
+/tmp/astro-worker.sock), the script runs there with numpy, scipy and
+astropy already imported. The worker gets this process's arguments,
+working directory, environment and stdin/stdout/stderr, and its exit
+status becomes ours. Otherwise the script runs in this process, as
+``python3 <script>`` would. Set ASTRO_WORKER_SOCKET to an empty string
+to never use the worker.
+
+The image installs this file as /usr/local/bin/astro-run, and the
+Exercise 3 and 4 tools use it as their baseCommand.
+"""
+import json
+import os
+import runpy
+import socket
+import struct
+import sys
+
+SOCKET_ENV = "ASTRO_WORKER_SOCKET"
+DEFAULT_SOCKET = "/tmp/astro-worker.sock"
+
+
+def connect(path):
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+    except OSError:
+        sock.close()
+        return None
+    return sock
+
+
+def run_in_worker(sock, script, args):
+    umask = os.umask(0)
+    os.umask(umask)
+    request = json.dumps({
+        "script": os.path.abspath(script),
+        "argv": args,
+        "cwd": os.getcwd(),
+        "env": dict(os.environ),
+        "umask": umask,
+    }).encode()
+    with sock:
+        socket.send_fds(sock, [struct.pack("!I", len(request)) + request], [0, 1, 2])
+        reply = b""
+        while True:
+            chunk = sock.recv(4096)
+            if not chunk:
+                break
+            reply += chunk
+    if not reply:
+        raise SystemExit(f"astro-run: astro-worker stopped before {script} finished")
+    return json.loads(reply)["exit_code"]
+
+
+def run_here(script, args):
+    sys.argv = [script] + args
+    sys.path[0] = os.path.dirname(os.path.abspath(script))
+    runpy.run_path(script, run_name="__main__")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        raise SystemExit("Usage: astro-run <script> [args...]")
+    script, args = sys.argv[1], sys.argv[2:]
+    path = os.environ.get(SOCKET_ENV, DEFAULT_SOCKET)
+    sock = connect(path) if path else None
+    if sock is None:
+        run_here(script, args)
+    else:
+        sys.exit(run_in_worker(sock, script, args))
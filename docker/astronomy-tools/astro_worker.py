@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""Persistent worker for the workshop tool scripts.
+
+Imports numpy, scipy, astropy and Pillow once, then runs tool scripts
+on request over a Unix socket. Each CWL tool starts its script through
+``astro-run`` (astro_run.py), which sends the script path, arguments, working
+directory, environment and its stdin/stdout/stderr descriptors. The
+worker forks; the child takes over the client's stdio, environment and
+working directory and runs the script as ``__main__``. The fork shares
+the modules already imported, so a step starts in milliseconds instead
+of paying the imports. The exit status goes back to the client, and the
+run is killed if the client goes away.
+
+Paths are used as the client sent them, so the worker has to see the
+same filesystem as the steps: run it in the container that runs
+``cwltool --no-container``, or next to a local cwltool.
+"""
+import argparse
+import importlib
+import json
+import os
+import runpy
+import select
+import signal
+import socket
+import struct
+import sys
+import traceback
+
+SOCKET_ENV = "ASTRO_WORKER_SOCKET"
+DEFAULT_SOCKET = "/tmp/astro-worker.sock"
+# Modules imported by the tool scripts that are slow to import
+PRELOAD = ["numpy", "scipy.fft", "scipy.ndimage", "astropy.io.fits", "astropy.wcs",
+           "PIL.Image", "PIL.ImageDraw"]
+# Descriptors sent with each request: stdin, stdout, stderr
+N_FDS = 3
+
+def preload(modules):
+    loaded = []
+    for name in modules:
+        try:
+            importlib.import_module(name)
+            loaded.append(name)
+        except ImportError as e:
+            print(f"astro-worker: cannot preload {name}: {e}", file=sys.stderr)
+    return loaded
+
+def read_request(conn):
+    """Length-prefixed JSON request and the descriptors sent with it.
+
+    Returns (None, []) if the client closed without sending anything.
+    """
+    data, fds, _, _ = socket.recv_fds(conn, 65536, N_FDS)
+    if not data and not fds:
+        return None, []
+    if len(data) < 4 or len(fds) != N_FDS:
+        raise ValueError("malformed request")
+    length = struct.unpack("!I", data[:4])[0]
+    body = data[4:]
+    while len(body) < length:
+        chunk = conn.recv(length - len(body))
+        if not chunk:
+            raise ValueError("truncated request")
+        body += chunk
+    return json.loads(body), fds
+
+def exit_code(code):
+    """Exit status for a SystemExit code, printing messages as Python does."""
+    if code is None:
+        return 0
+    if isinstance(code, int):
+        return code & 0xFF
+    print(code, file=sys.stderr)
+    return 1
+
+def run_tool(request, fds):
+    """In the forked child: become the client's process and run the script."""
+    os.setpgid(0, 0)
+    for sig in (signal.SIGINT, signal.SIGTERM, signal.SIGHUP, signal.SIGCHLD):
+        signal.signal(sig, signal.SIG_DFL)
+    for target, fd in enumerate(fds):
+        os.dup2(fd, target)
+        os.close(fd)
+    os.chdir(request["cwd"])
+    os.umask(request["umask"])
+    os.environ.clear()
+    os.environ.update(request["env"])
+    script = request["script"]
+    sys.argv = [script] + request["argv"]
+    sys.path[0] = os.path.dirname(script)
+    code = 0
+    try:
+        runpy.run_path(script, run_name="__main__")
+    except SystemExit as e:
+        code = exit_code(e.code)
+    except BaseException:
+        traceback.print_exc()
+        code = 1
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+    os._exit(code)
+
+def wait_status(pid):
+    status = os.waitstatus_to_exitcode(os.waitpid(pid, 0)[1])
+    # Killed by a signal: report it the way a shell does
+    return status if status >= 0 else 128 - status
+
+def wait_or_cancel(pid, conn):
+    """Exit status of ``pid``, or None after killing it if the client hung up."""
+    try:
+        pidfd = os.pidfd_open(pid)
+    except (AttributeError, OSError):
+        # No pidfd (Linux < 5.3): wait without watching the client
+        return wait_status(pid)
+    poller = select.poll()
+    poller.register(pidfd, select.POLLIN)
+    poller.register(conn, select.POLLIN | select.POLLHUP)
+    while True:
+        ready = {fd for fd, _ in poller.poll()}
+        if pidfd in ready:
+            os.close(pidfd)
+            return wait_status(pid)
+        if conn.fileno() in ready:
+            os.killpg(pid, signal.SIGTERM)
+            os.waitpid(pid, 0)
+            return None
+
+def handle(conn, listener):
+    """In a forked handler: run one request and report its exit status."""
+    signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    listener.close()
+    try:
+        request, fds = read_request(conn)
+        if request is None:
+            return
+        pid = os.fork()
+        if pid == 0:
+            conn.close()
+            run_tool(request, fds)
+        for fd in fds:
+            os.close(fd)
+        status = wait_or_cancel(pid, conn)
+        if status is not None:
+            conn.sendall(json.dumps({"exit_code": status}).encode())
+    except Exception:
+        traceback.print_exc()
+    finally:
+        os._exit(0)
+
+def serve(path, modules):
+    # Received descriptors must not land on 0-2, which the child overwrites
+    for fd in range(N_FDS):
+        try:
+            os.fstat(fd)
+        except OSError:
+            os.open(os.devnull, os.O_RDWR)
+    loaded = preload(modules)
+
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    if os.path.exists(path):
+        try:
+            listener.connect(path)
+            raise SystemExit(f"astro-worker: already running on {path}")
+        except ConnectionRefusedError:
+            os.unlink(path)
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    # Only this user may connect: requests run code with the worker's rights
+    umask = os.umask(0o177)
+    try:
+        listener.bind(path)
+    finally:
+        os.umask(umask)
+    listener.listen(64)
+
+    # Handlers exit on their own; ignoring SIGCHLD reaps them
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    print(f"astro-worker: listening on {path}, preloaded {', '.join(loaded)}", flush=True)
+    try:
+        while True:
+            conn, _ = listener.accept()
+            if os.fork() == 0:
+                handle(conn, listener)
+            conn.close()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        listener.close()
+        os.unlink(path)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve workshop tool runs with preloaded imports.")
+    parser.add_argument("--socket", default=os.environ.get(SOCKET_ENV) or DEFAULT_SOCKET,
+                        help=f"Unix socket to listen on (default: {SOCKET_ENV} or {DEFAULT_SOCKET})")
+    parser.add_argument("--preload", nargs="*", default=PRELOAD,
+                        help="Modules to import before serving")
+    args = parser.parse_args()
+    serve(args.socket, args.preload)
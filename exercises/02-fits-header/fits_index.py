@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+"""Index the FITS headers under a directory in SQLite, and query the index.
+
+``build`` walks a directory tree and reads only the header blocks of
+every HDU. Each header is parsed up to its END card, and the data after
+it is skipped using the size given by BITPIX, NAXISn, PCOUNT and GCOUNT,
+so no pixel data is read. Files are parsed in a process pool. Files
+whose size and modification time match the index are skipped, and
+files that have gone are dropped, so re-running only reads what changed.
+
+``query`` selects files by OBJECT, TELESCOP, DATE-OBS range, sky
+position and any header keyword, and writes a table, JSON, a path list
+or a CWL job file listing the matching files.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from astropy.io import fits
+import argparse
+import gzip
+import json
+import math
+import os
+import re
+import shutil
+import sqlite3
+
+FITS_SUFFIXES = (".fits", ".fit", ".fts", ".fz", ".fits.gz", ".fit.gz", ".fts.gz")
+BLOCK = 2880
+# Cards not worth indexing
+SKIP_KEYWORDS = {"", "COMMENT", "HISTORY", "END"}
+# Files parsed per task sent to a worker process
+CHUNKSIZE = 16
+# Files stored per transaction
+COMMIT_EVERY = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    size INTEGER,
+    mtime_ns INTEGER,
+    n_hdus INTEGER,
+    object TEXT,
+    telescope TEXT,
+    date_obs TEXT,
+    ra_deg REAL,
+    dec_deg REAL,
+    -- Unit vector of (ra, dec), for cone searches without trigonometry in SQL
+    x REAL, y REAL, z REAL,
+    error TEXT
+);
+CREATE TABLE IF NOT EXISTS hdus (
+    file_id INTEGER, hdu INTEGER, type TEXT, extname TEXT, shape TEXT, bitpix INTEGER,
+    PRIMARY KEY (file_id, hdu)
+);
+CREATE TABLE IF NOT EXISTS keywords (file_id INTEGER, hdu INTEGER, keyword TEXT, value TEXT);
+CREATE INDEX IF NOT EXISTS files_object ON files (object COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS files_telescope ON files (telescope COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS files_date_obs ON files (date_obs);
+CREATE INDEX IF NOT EXISTS files_dec ON files (dec_deg);
+CREATE INDEX IF NOT EXISTS keywords_keyword ON keywords (keyword, value COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS keywords_file ON keywords (file_id);
+"""
+
+def data_size(header):
+    """Bytes of data (with padding) that follow a header."""
+    naxis = header.get("NAXIS", 0)
+    if naxis == 0:
+        return 0
+    axes = [header.get(f"NAXIS{i}", 0) for i in range(1, naxis + 1)]
+    if header.get("GROUPS") and axes[0] == 0:
+        # Random groups: NAXIS1 = 0 is not a real axis
+        axes = axes[1:]
+    bits = abs(header["BITPIX"]) * header.get("GCOUNT", 1) * (header.get("PCOUNT", 0) + math.prod(axes))
+    return -(-(bits // 8) // BLOCK) * BLOCK
+
+def hdu_shape(header):
+    """Array shape (numpy order) from NAXISn, or ZNAXISn for compressed images."""
+    prefix = "ZNAXIS" if header.get("ZIMAGE") else "NAXIS"
+    shape = [header.get(f"{prefix}{i}", 0) for i in range(header.get(prefix, 0), 0, -1)]
+    if header.get("GROUPS") and shape and shape[-1] == 0:
+        # Random groups: the shape of one group, as astropy reports it
+        shape = shape[:-1]
+    return shape
+
+def read_headers(path):
+    """Header of every HDU, without reading any data."""
+    opener = gzip.open if path.endswith(".gz") else open
+    headers = []
+    with opener(path, "rb") as f:
+        while True:
+            try:
+                header = fits.Header.fromfile(f, endcard=True, padding=True)
+            except EOFError:
+                break
+            headers.append(header)
+            f.seek(data_size(header), os.SEEK_CUR)
+    return headers
+
+def card_value(value):
+    if isinstance(value, bool):
+        return "T" if value else "F"
+    return str(value)
+
+def normalize_date(value):
+    """DATE-OBS as an ISO string; the old dd/mm/yy form is converted."""
+    if not isinstance(value, str):
+        return None
+    value = value.strip()
+    old = re.fullmatch(r"(\d\d)/(\d\d)/(\d\d)", value)
+    if old:
+        return f"19{old.group(3)}-{old.group(2)}-{old.group(1)}"
+    return value if re.match(r"\d{4}-\d\d-\d\d", value) else None
+
+def sexagesimal(value, scale):
+    """Degrees from a number (already degrees) or a 'dd:mm:ss' / 'dd mm ss' string times ``scale``."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    parts = re.split(r"[:\s]+", str(value).strip())
+    try:
+        numbers = [float(p) for p in parts]
+    except ValueError:
+        return None
+    if not 1 <= len(numbers) <= 3:
+        return None
+    sign = -1.0 if parts[0].startswith("-") else 1.0
+    degrees = abs(numbers[0]) + sum(n / 60 ** i for i, n in enumerate(numbers[1:], start=1))
+    return sign * degrees * (scale if len(numbers) > 1 else 1.0)
+
+def sky_position(header):
+    """(ra, dec) in degrees from the WCS reference point or RA/DEC keywords."""
+    ctypes = [str(header.get(f"CTYPE{i}", "")) for i in (1, 2)]
+    if ctypes[0].startswith("RA") and ctypes[1].startswith("DEC"):
+        ra, dec = header.get("CRVAL1"), header.get("CRVAL2")
+    elif ctypes[0].startswith("DEC") and ctypes[1].startswith("RA"):
+        ra, dec = header.get("CRVAL2"), header.get("CRVAL1")
+    else:
+        ra = header.get("RA", header.get("OBJCTRA"))
+        dec = header.get("DEC", header.get("OBJCTDEC"))
+        ra = sexagesimal(ra, 15.0) if ra is not None else None
+        dec = sexagesimal(dec, 1.0) if dec is not None else None
+    if isinstance(ra, (int, float)) and isinstance(dec, (int, float)) and -90 <= dec <= 90:
+        return float(ra) % 360, float(dec)
+    return None
+
+def unit_vector(ra, dec):
+    ra, dec = math.radians(ra), math.radians(dec)
+    return math.cos(dec) * math.cos(ra), math.cos(dec) * math.sin(ra), math.sin(dec)
+
+def parse_file(job):
+    """Index record of one file; errors are recorded, not raised."""
+    root, path, size, mtime_ns = job
+    record = {"path": path, "size": size, "mtime_ns": mtime_ns, "hdus": [], "error": None}
+    try:
+        headers = read_headers(os.path.join(root, path))
+    except Exception as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+        return record
+    position = None
+    for i, header in enumerate(headers):
+        record["hdus"].append({
+            "hdu": i,
+            "type": header.get("XTENSION", "PRIMARY").strip(),
+            "extname": header.get("EXTNAME"),
+            "shape": hdu_shape(header),
+            "bitpix": header.get("ZBITPIX" if header.get("ZIMAGE") else "BITPIX"),
+            "cards": [(k, card_value(v)) for k, v in header.items() if k not in SKIP_KEYWORDS],
+        })
+        position = position or sky_position(header)
+    # Observation keywords come from the first HDU that has them
+    def first(keyword):
+        return next((h[keyword] for h in headers if keyword in h), None)
+    record["object"] = str(first("OBJECT")).strip() if first("OBJECT") is not None else None
+    record["telescope"] = str(first("TELESCOP")).strip() if first("TELESCOP") is not None else None
+    record["date_obs"] = normalize_date(first("DATE-OBS"))
+    record["position"] = position
+    return record
+
+def connect(index_file):
+    conn = sqlite3.connect(index_file)
+    conn.executescript(SCHEMA)
+    return conn
+
+def scan(root):
+    """(relative path, size, mtime_ns) of every FITS file under ``root``."""
+    for dirpath, dirnames, filenames in os.walk(root, followlinks=True):
+        dirnames[:] = sorted(d for d in dirnames if not d.startswith("."))
+        for name in sorted(filenames):
+            if name.lower().endswith(FITS_SUFFIXES) and not name.startswith("."):
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                yield os.path.relpath(path, root), st.st_size, st.st_mtime_ns
+
+def delete_file(conn, path):
+    row = conn.execute("SELECT id FROM files WHERE path = ?", (path,)).fetchone()
+    if row:
+        for table, column in (("keywords", "file_id"), ("hdus", "file_id"), ("files", "id")):
+            conn.execute(f"DELETE FROM {table} WHERE {column} = ?", (row[0],))
+
+def store(conn, record):
+    delete_file(conn, record["path"])
+    position = record.get("position")
+    xyz = unit_vector(*position) if position else (None, None, None)
+    cursor = conn.execute(
+        "INSERT INTO files (path, size, mtime_ns, n_hdus, object, telescope, date_obs, "
+        "ra_deg, dec_deg, x, y, z, error) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        (record["path"], record["size"], record["mtime_ns"], len(record["hdus"]),
+         record.get("object"), record.get("telescope"), record.get("date_obs"),
+         *(position or (None, None)), *xyz, record["error"]))
+    file_id = cursor.lastrowid
+    conn.executemany("INSERT INTO hdus VALUES (?, ?, ?, ?, ?, ?)",
+                     [(file_id, h["hdu"], h["type"], h["extname"], json.dumps(h["shape"]), h["bitpix"])
+                      for h in record["hdus"]])
+    conn.executemany("INSERT INTO keywords VALUES (?, ?, ?, ?)",
+                     [(file_id, h["hdu"], k, v) for h in record["hdus"] for k, v in h["cards"]])
+
+def build_index(root, index_file, workers=1, full=False, previous=None):
+    if previous and os.path.abspath(previous) != os.path.abspath(index_file):
+        shutil.copyfile(previous, index_file)
+    conn = connect(index_file)
+    known = {path: (size, mtime) for path, size, mtime in conn.execute("SELECT path, size, mtime_ns FROM files")}
+    found = {path: (size, mtime) for path, size, mtime in scan(root)}
+    removed = sorted(known.keys() - found.keys())
+    jobs = [(root, path, size, mtime) for path, (size, mtime) in found.items()
+            if full or known.get(path) != (size, mtime)]
+
+    with conn:
+        for path in removed:
+            delete_file(conn, path)
+    failed = 0
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 and len(jobs) > 1 else None
+    try:
+        records = pool.map(parse_file, jobs, chunksize=CHUNKSIZE) if pool else map(parse_file, jobs)
+        for i, record in enumerate(records, start=1):
+            store(conn, record)
+            failed += record["error"] is not None
+            if i % COMMIT_EVERY == 0:
+                conn.commit()
+    finally:
+        if pool:
+            pool.shutdown()
+    conn.execute("INSERT OR REPLACE INTO meta VALUES ('root', ?)", (os.path.abspath(root),))
+    conn.commit()
+    conn.close()
+
+    print(f"Indexed {len(jobs)} of {len(found)} FITS files ({len(found) - len(jobs)} unchanged, "
+          f"{len(removed)} removed, {failed} unreadable) into {index_file}")
+    return {"files": len(found), "indexed": len(jobs), "removed": len(removed), "failed": failed}
+
+def like_pattern(text):
+    """SQL LIKE pattern from a shell-style pattern (* and ?)."""
+    escaped = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return escaped.replace("*", "%").replace("?", "_")
+
+def angular_separation(ra1, dec1, ra2, dec2):
+    ra1, dec1, ra2, dec2 = map(math.radians, (ra1, dec1, ra2, dec2))
+    # Haversine form, accurate at small separations
+    h = (math.sin((dec2 - dec1) / 2) ** 2
+         + math.cos(dec1) * math.cos(dec2) * math.sin((ra2 - ra1) / 2) ** 2)
+    return math.degrees(2 * math.asin(min(1.0, math.sqrt(h))))
+
+def query_index(index_file, object_name=None, telescope=None, date_from=None, date_to=None,
+                cone=None, keywords=()):
+    """Files matching every given condition, ordered by DATE-OBS."""
+    clauses, params = ["error IS NULL"], []
+    if object_name:
+        clauses.append("object LIKE ? ESCAPE '\\'")
+        params.append(like_pattern(object_name))
+    if telescope:
+        clauses.append("telescope LIKE ? ESCAPE '\\'")
+        params.append(like_pattern(telescope))
+    if date_from:
+        clauses.append("date_obs >= ?")
+        params.append(date_from)
+    if date_to:
+        # Inclusive at the precision given: 2025-01-15 includes that whole day
+        clauses.append("substr(date_obs, 1, ?) <= ?")
+        params += [len(date_to), date_to]
+    if cone:
+        ra, dec, radius = cone
+        cx, cy, cz = unit_vector(ra, dec)
+        clauses.append("dec_deg BETWEEN ? AND ? AND x * ? + y * ? + z * ? >= ?")
+        params += [dec - radius, dec + radius, cx, cy, cz, math.cos(math.radians(radius)) - 1e-12]
+    for keyword, value in keywords:
+        clauses.append("id IN (SELECT file_id FROM keywords WHERE keyword = ? AND value = ? COLLATE NOCASE)")
+        params += [keyword.upper(), value]
+
+    conn = connect(index_file)
+    root = (conn.execute("SELECT value FROM meta WHERE key = 'root'").fetchone() or [None])[0]
+    columns = ["id", "path", "object", "telescope", "date_obs", "ra_deg", "dec_deg", "n_hdus"]
+    rows = conn.execute(f"SELECT {', '.join(columns)} FROM files WHERE {' AND '.join(clauses)} "
+                        "ORDER BY date_obs, path", params).fetchall()
+    matches = []
+    for row in rows:
+        match = dict(zip(columns, row))
+        match["shapes"] = [json.loads(shape) for (shape,) in conn.execute(
+            "SELECT shape FROM hdus WHERE file_id = ? ORDER BY hdu", (match.pop("id"),))]
+        if cone:
+            match["separation_deg"] = round(angular_separation(cone[0], cone[1], match["ra_deg"], match["dec_deg"]), 6)
+        matches.append(match)
+    conn.close()
+    return root, matches
+
+def format_matches(matches, root, fmt, input_name="fits_images"):
+    if fmt == "json":
+        return json.dumps(matches, indent=2) + "\n"
+    paths = [os.path.join(root, m["path"]) if root else m["path"] for m in matches]
+    if fmt == "paths":
+        return "".join(p + "\n" for p in paths)
+    if fmt == "job":
+        # JSON is valid YAML, so this is a job file for a workflow taking File[]
+        return json.dumps({input_name: [{"class": "File", "path": p} for p in paths]}, indent=2) + "\n"
+    lines = [f"{'path':<40} {'object':<20} {'telescope':<10} {'date_obs':<23} {'ra_deg':>10} {'dec_deg':>10}"]
+    for m in matches:
+        ra = f"{m['ra_deg']:.5f}" if m["ra_deg"] is not None else "-"
+        dec = f"{m['dec_deg']:.5f}" if m["dec_deg"] is not None else "-"
+        lines.append(f"{m['path']:<40} {m['object'] or '-':<20} {m['telescope'] or '-':<10} "
+                     f"{m['date_obs'] or '-':<23} {ra:>10} {dec:>10}")
+    lines.append(f"{len(matches)} files")
+    return "\n".join(lines) + "\n"
+
+def keyword_filter(text):
+    if "=" not in text:
+        raise argparse.ArgumentTypeError("expected KEYWORD=VALUE")
+    keyword, value = text.split("=", 1)
+    return keyword.strip(), value.strip()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Index FITS headers in SQLite and query them.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="Index (or update the index of) a directory tree")
+    build.add_argument("root", help="Directory to scan for FITS files")
+    build.add_argument("index", help="SQLite index to create or update")
+    build.add_argument("--workers", type=int, default=1, help="Parse headers in this many processes")
+    build.add_argument("--full", action="store_true", help="Re-read every file, not just changed ones")
+    build.add_argument("--previous", help="Start from a copy of this index and only read what changed")
+
+    query = commands.add_parser("query", help="Select files from an index")
+    query.add_argument("index")
+    query.add_argument("--object", help="OBJECT, with * and ? wildcards (case-insensitive)")
+    query.add_argument("--telescope", help="TELESCOP, with * and ? wildcards (case-insensitive)")
+    query.add_argument("--date-from", help="Earliest DATE-OBS (ISO, inclusive)")
+    query.add_argument("--date-to", help="Latest DATE-OBS (ISO, inclusive at the precision given)")
+    query.add_argument("--cone", nargs=3, type=float, metavar=("RA", "DEC", "RADIUS"),
+                       help="Files whose position is within RADIUS of (RA, DEC), all in degrees")
+    query.add_argument("--keyword", action="append", type=keyword_filter, default=[],
+                       metavar="KEYWORD=VALUE", help="Any header keyword in any HDU (repeatable)")
+    query.add_argument("--format", choices=["table", "json", "paths", "job"], default="table")
+    query.add_argument("--root", help="Directory the indexed paths are relative to (default: as indexed)")
+    query.add_argument("--input-name", default="fits_images", help="Workflow input named in a job file")
+    query.add_argument("--output", help="Write here instead of standard output")
+
+    args = parser.parse_args()
+    if args.command == "build":
+        build_index(args.root, args.index, args.workers, args.full, args.previous)
+    else:
+        root, matches = query_index(args.index, args.object, args.telescope, args.date_from,
+                                    args.date_to, args.cone, args.keyword)
+        text = format_matches(matches, args.root or root, args.format, args.input_name)
+        if args.output:
+            with open(args.output, "w") as f:
+                f.write(text)
+        else:
+            print(text, end="")
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""Extract header, statistics and thumbnail from a FITS image.
+
+The file is opened once. A first pass over the memmap gives the moments
+and the thumbnail. The median, p1, p99 and MAD come from the histogram
+sketches of ``quantile_sketch``, which read the data again in the same
+row blocks: one pass, plus up to ``quantile_sketch.MAX_REFINE_PASSES``
+refinement passes until the quantiles are within ``REL_ERROR``.
+``sketch_passes`` in the statistics records how many were made (none
+for a constant image). Memory stays bounded by one block.
+"""
+from astropy.io import fits
+import numpy as np
+import json
+import sys
+import time
+
+import quantile_sketch
+import render
+import step_metrics
+
+# Pixels read from the memmap per block
+BLOCK_PIXELS = 4 * 1024 * 1024
+# Longest side of the reduced image the thumbnail is drawn from
+PREVIEW_SIZE = 512
+# Longest side of the written thumbnail
+THUMBNAIL_SIZE = 256
+# Quantile error bound as a fraction of the p1-p99 spread
+REL_ERROR = 1e-3
+
+def find_image_hdu(hdul):
+    """Return the first HDU with pixel data, preferring the primary."""
+    for hdu in hdul:
+        if hdu.data is not None:
+            return hdu
+    return None
+
+def merge_moments(acc, count, mean, m2):
+    """Merge block moments into the running totals (Chan et al.)."""
+    n = acc['count'] + count
+    delta = mean - acc['mean']
+    acc['mean'] += delta * count / n
+    acc['m2'] += m2 + delta * delta * acc['count'] * count / n
+    acc['count'] = n
+
+def analyze_image(fits_file, header_file, stats_file, thumbnail_file):
+    t0 = time.time()
+    with fits.open(fits_file, memmap=True) as hdul:
+        # Header: same format as extract-header.cwl
+        header = dict(hdul[0].header)
+        clean_header = {k: str(v) for k, v in header.items() if k}
+
+        hdu = find_image_hdu(hdul)
+        t1 = time.time()
+        if hdu is None:
+            stats = {"error": "No image data found"}
+            preview = None
+        else:
+            data = hdu.data
+            shape = data.shape
+            nx = shape[-1]
+            ny = shape[-2] if data.ndim > 1 else 1
+            rows = data.reshape(-1, nx)
+
+            # Thumbnail is built from the first plane, block-averaged
+            # by `factor` while the statistics pass streams through it
+            factor = max(1, -(-max(ny, nx) // PREVIEW_SIZE))
+            out_ny, out_nx = -(-ny // factor), -(-nx // factor)
+            preview_sum = np.zeros((out_ny, out_nx))
+            preview_count = np.zeros((out_ny, out_nx))
+
+            block_rows = max(factor, BLOCK_PIXELS // nx // factor * factor)
+            acc = {'count': 0, 'mean': 0.0, 'm2': 0.0}
+            vmin, vmax = np.inf, -np.inf
+            for r0 in range(0, rows.shape[0], block_rows):
+                block = np.asarray(rows[r0:r0 + block_rows], dtype=np.float64)
+                valid = np.isfinite(block)
+                values = block[valid]
+                n = values.size
+
+                if n > 0:
+                    vmin = min(vmin, values.min())
+                    vmax = max(vmax, values.max())
+                    mean = values.mean()
+                    merge_moments(acc, n, mean, np.sum((values - mean) ** 2))
+
+                if r0 < ny:
+                    plane = block[:max(0, min(block.shape[0], ny - r0))]
+                    pad_y = -plane.shape[0] % factor
+                    pad_x = -nx % factor
+                    filled = np.pad(np.where(np.isfinite(plane), plane, 0.0),
+                                    ((0, pad_y), (0, pad_x)))
+                    counts = np.pad(np.isfinite(plane).astype(np.float64),
+                                    ((0, pad_y), (0, pad_x)))
+                    oy = r0 // factor
+                    by = filled.shape[0] // factor
+                    preview_sum[oy:oy + by] += filled.reshape(by, factor, out_nx, factor).sum(axis=(1, 3))
+                    preview_count[oy:oy + by] += counts.reshape(by, factor, out_nx, factor).sum(axis=(1, 3))
+
+            n_valid = acc['count']
+            std = float(np.sqrt(acc['m2'] / n_valid)) if n_valid > 0 else None
+            quantiles = {}
+            if n_valid > 0:
+                quantiles = quantile_sketch.sketch_quantiles(rows, block_rows, n_valid, vmin, vmax,
+                                                             std, REL_ERROR)
+
+            stats = {
+                "shape": list(shape),
+                "dtype": str(data.dtype),
+                "min": float(vmin) if n_valid > 0 else None,
+                "max": float(vmax) if n_valid > 0 else None,
+                "mean": float(acc['mean']) if n_valid > 0 else None,
+                "median": quantiles.get("median"),
+                "std": std,
+                "p1": quantiles.get("p1"),
+                "p99": quantiles.get("p99"),
+                "mad": quantiles.get("mad"),
+                "total_pixels": int(data.size),
+                "valid_pixels": int(n_valid),
+                "nan_pixels": int(data.size - n_valid)
+            }
+            if quantiles:
+                stats["quantile_error_bound"] = quantiles["quantile_error_bound"]
+                stats["sketch_passes"] = quantiles["sketch_passes"]
+
+            with np.errstate(invalid='ignore', divide='ignore'):
+                preview = preview_sum / preview_count
+
+    t2 = time.time()
+    with open(header_file, 'w') as f:
+        json.dump(clean_header, f, indent=2)
+
+    with open(stats_file, 'w') as f:
+        json.dump(stats, f, indent=2)
+
+    if preview is None or not np.isfinite(preview).any():
+        thumb = render.placeholder(THUMBNAIL_SIZE)
+    else:
+        vmin, vmax = render.zscale_limits(preview)
+        thumb = render.fit_to_size(render.colorize(preview, vmin, vmax), THUMBNAIL_SIZE)
+    thumb.save(thumbnail_file, format='PNG')
+    # The pixels are read during "compute"; "write" includes drawing the thumbnail
+    step_metrics.add_phases({"open": t1 - t0, "compute": t2 - t1, "write": time.time() - t2})
+
+    print(f"Extracted {len(clean_header)} keywords, mean={stats.get('mean')}, thumbnail saved to {thumbnail_file}")
+
+if __name__ == "__main__":
+    if len(sys.argv) != 5:
+        print("Usage: analyze_image.py <input.fits> <header.json> <stats.json> <thumbnail.png>")
+        sys.exit(1)
+    step_metrics.start("analyze-image")
+    analyze_image(sys.argv[1], sys.argv[2], sys.argv[3], sys.argv[4])
+    step_metrics.write()
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""Content-addressed on-disk cache for FITS analysis tool outputs.
+
+Entries are keyed by the input content, the tool script and its
+parameters. Content comes from the CHECKSUM/DATASUM cards when every HDU
+has them, otherwise from a streaming SHA-256 of the file. The cache is
+trimmed to a size limit by evicting the least recently used entries.
+"""
+from astropy.io import fits
+import hashlib
+import fcntl
+import json
+import os
+import shutil
+import time
+
+HASH_CHUNK = 8 * 1024 * 1024
+
+def file_digest(path):
+    """Streaming SHA-256 of a file."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while chunk := f.read(HASH_CHUNK):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def content_key(fits_file, header_only=False):
+    """Identify the content of ``fits_file`` as cheaply as possible.
+
+    With ``header_only`` only the header blocks are hashed, which is all
+    a header-extraction tool depends on.
+    """
+    with fits.open(fits_file, memmap=True) as hdul:
+        headers = [hdu.header for hdu in hdul]
+    if header_only:
+        digest = hashlib.sha256()
+        for header in headers:
+            digest.update(header.tostring().encode('ascii', 'replace'))
+        return "header:" + digest.hexdigest()
+    if all('CHECKSUM' in h and 'DATASUM' in h for h in headers):
+        sums = ",".join(f"{h['CHECKSUM']}/{h['DATASUM']}" for h in headers)
+        return f"checksum:{os.path.getsize(fits_file)}:{sums}"
+    return "sha256:" + file_digest(fits_file)
+
+def tool_version(*scripts):
+    """Hash of the tool's source, so edited tools never reuse old entries."""
+    digest = hashlib.sha256()
+    for script in scripts:
+        with open(script, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+class FitsCache:
+    def __init__(self, cache_dir, max_bytes):
+        self.cache_dir = cache_dir
+        self.entries = os.path.join(cache_dir, "entries")
+        self.max_bytes = max_bytes
+        os.makedirs(self.entries, exist_ok=True)
+
+    def _locked(self):
+        lock = open(os.path.join(self.cache_dir, ".lock"), 'w')
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        return lock
+
+    def _update_counters(self, **deltas):
+        path = os.path.join(self.cache_dir, "counters.json")
+        counters = {"hits": 0, "misses": 0, "evictions": 0}
+        if os.path.exists(path):
+            with open(path) as f:
+                counters.update(json.load(f))
+        for k, v in deltas.items():
+            counters[k] += v
+        with open(path, 'w') as f:
+            json.dump(counters, f, indent=2)
+        return counters
+
+    def fetch(self, key, outputs):
+        """Copy a cached entry to ``outputs``; returns True on a hit."""
+        entry = os.path.join(self.entries, key)
+        with self._locked():
+            meta_path = os.path.join(entry, "meta.json")
+            if not os.path.exists(meta_path):
+                return False
+            for i, path in enumerate(outputs):
+                shutil.copyfile(os.path.join(entry, f"output-{i}"), path)
+            # Touching meta.json marks the entry as recently used
+            os.utime(meta_path)
+        return True
+
+    def store(self, key, outputs, description):
+        """Add ``outputs`` under ``key`` and evict down to the size limit."""
+        tmp = os.path.join(self.entries, f".tmp-{key}-{os.getpid()}")
+        os.makedirs(tmp, exist_ok=True)
+        size = 0
+        for i, path in enumerate(outputs):
+            shutil.copyfile(path, os.path.join(tmp, f"output-{i}"))
+            size += os.path.getsize(path)
+        with open(os.path.join(tmp, "meta.json"), 'w') as f:
+            json.dump({"description": description, "bytes": size,
+                       "created": time.time()}, f, indent=2)
+
+        with self._locked():
+            entry = os.path.join(self.entries, key)
+            if os.path.exists(entry):
+                shutil.rmtree(tmp)
+            else:
+                os.rename(tmp, entry)
+            return self._evict()
+
+    def _evict(self):
+        """Remove least recently used entries until under ``max_bytes``."""
+        entries = []
+        for name in os.listdir(self.entries):
+            meta_path = os.path.join(self.entries, name, "meta.json")
+            if name.startswith(".") or not os.path.exists(meta_path):
+                continue
+            with open(meta_path) as f:
+                size = json.load(f)["bytes"]
+            entries.append((os.path.getmtime(meta_path), size, name))
+        total = sum(e[1] for e in entries)
+        evicted = 0
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(os.path.join(self.entries, name))
+            total -= size
+            evicted += 1
+        return evicted, total
+
+    def run(self, fits_file, tool, scripts, params, outputs, compute, header_only=False):
+        """Produce ``outputs`` from the cache, or by calling ``compute``.
+
+        Writes cache_stats.json next to the outputs with the result of
+        this lookup and the cache-wide counters.
+        """
+        start = time.time()
+        key_source = {
+            "content": content_key(fits_file, header_only),
+            "tool": tool,
+            "version": tool_version(*scripts),
+            "params": params,
+        }
+        key = hashlib.sha256(json.dumps(key_source, sort_keys=True).encode()).hexdigest()
+
+        hit = self.fetch(key, outputs)
+        evicted, cache_bytes = 0, None
+        if not hit:
+            compute()
+            evicted, cache_bytes = self.store(key, outputs, key_source)
+
+        with self._locked():
+            counters = self._update_counters(hits=int(hit), misses=int(not hit),
+                                             evictions=evicted)
+        stats = {
+            "tool": tool,
+            "key": key,
+            "content": key_source["content"],
+            "hit": hit,
+            "evicted": evicted,
+            "cache_bytes": cache_bytes,
+            "max_bytes": self.max_bytes,
+            "seconds": round(time.time() - start, 4),
+            **counters,
+        }
+        with open("cache_stats.json", 'w') as f:
+            json.dump(stats, f, indent=2)
+        print(f"Cache {'hit' if hit else 'miss'} for {tool} ({counters['hits']} hits, {counters['misses']} misses)")
+        return hit
+
+def cached(cache_dir, max_mb, fits_file, tool, scripts, params, outputs, compute, header_only=False):
+    """Run ``compute`` through the cache in ``cache_dir``, or directly if unset."""
+    if not cache_dir:
+        compute()
+        return False
+    cache = FitsCache(cache_dir, int(max_mb * 1024 * 1024))
+    return cache.run(fits_file, tool, scripts, params, outputs, compute, header_only)
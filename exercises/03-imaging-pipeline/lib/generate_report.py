@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""Generate HTML reports from pipeline outputs.
+
+The single-image report embeds the thumbnail and is one self-contained
+file. The survey report (``--survey DIR``) covers any number of images:
+rows are streamed to JavaScript data files of ``--page-size`` rows while
+the header and stats JSONs are read one pair at a time, and thumbnails
+are linked as files next to the page. The page loads the data files and
+shows a sortable, filterable, paginated table, so memory and time per
+image stay the same whatever the image count.
+"""
+from datetime import datetime
+import argparse
+import base64
+import html
+import json
+import os
+import shutil
+
+import step_metrics
+
+# Header keywords listed in the single-image report
+IMPORTANT_KEYS = ['OBJECT', 'TELESCOP', 'INSTRUME', 'DATE-OBS', 'EXPTIME',
+                  'RA', 'DEC', 'NAXIS1', 'NAXIS2', 'BITPIX', 'BUNIT']
+# Statistics shown as cards in the single-image report: (key, label)
+STAT_CARDS = [('mean', 'Mean'), ('median', 'Median'), ('std', 'Std Dev'),
+              ('min', 'Minimum'), ('max', 'Maximum'), ('total_pixels', 'Total Pixels')]
+# Columns of the survey table, taken from the header and stats JSONs
+SURVEY_KEYWORDS = ['OBJECT', 'TELESCOP', 'DATE-OBS']
+SURVEY_STATS = ['mean', 'median', 'std', 'min', 'max']
+# Rows per data file and per table page in the survey report
+PAGE_SIZE = 100
+# Suffixes written by the imaging tools, used to pair files by image
+SUFFIXES = {"header": "-header.json", "stats": "-stats.json", "thumbnail": "-thumbnail.png"}
+
+STYLE = '''
+        body { font-family: Arial, sans-serif; margin: 40px; background: #1a1a2e; color: #eee; }
+        h1 { color: #00d4ff; border-bottom: 2px solid #00d4ff; padding-bottom: 10px; }
+        h2 { color: #00d4ff; margin-top: 30px; }
+        .container { max-width: 1000px; margin: 0 auto; }
+        .stats-grid { display: grid; grid-template-columns: repeat(3, 1fr); gap: 20px; }
+        .stat-card { background: #16213e; padding: 20px; border-radius: 8px; text-align: center; }
+        .stat-value { font-size: 24px; font-weight: bold; color: #00d4ff; }
+        .stat-label { color: #888; margin-top: 5px; }
+        .thumbnail { text-align: center; margin: 30px 0; }
+        .thumbnail img { max-width: 400px; border: 2px solid #00d4ff; border-radius: 8px; }
+        table { width: 100%; border-collapse: collapse; margin-top: 20px; }
+        th, td { padding: 10px; text-align: left; border-bottom: 1px solid #333; }
+        th { background: #16213e; color: #00d4ff; }
+        .timestamp { color: #666; font-size: 12px; margin-top: 40px; }'''
+
+SURVEY_STYLE = '''
+        .container { max-width: 1400px; }
+        th { cursor: pointer; user-select: none; white-space: nowrap; }
+        td img { width: 96px; height: 96px; object-fit: contain; background: #000; }
+        .controls { margin-top: 30px; display: flex; gap: 12px; align-items: center; }
+        .controls input, .controls button { background: #16213e; color: #eee; border: 1px solid #00d4ff;
+                                            border-radius: 4px; padding: 6px 10px; }
+        .error { color: #ff6b6b; }'''
+
+# Loads the data files one after another, then renders the page that is
+# shown; only one page of rows (and thumbnails) is in the DOM at a time
+SURVEY_SCRIPT = '''
+const columns = __COLUMNS__;
+const rows = [];
+let view = rows, sortKey = null, sortDir = 1, page = 0;
+function addRows(chunk) { rows.push(...chunk); }
+
+function cell(row, col) {
+    const value = row[col.key];
+    if (col.key === 'thumbnail') {
+        return value ? '<td><img loading="lazy" src="' + encodeURI(value) + '" alt=""></td>' : '<td></td>';
+    }
+    if (value === null || value === undefined) return '<td></td>';
+    const text = typeof value === 'number' ? value.toPrecision(5) : String(value);
+    const escaped = text.replace(/&/g, '&amp;').replace(/</g, '&lt;').replace(/>/g, '&gt;');
+    return '<td' + (col.key === 'status' && value !== 'success' ? ' class="error"' : '') + '>' + escaped + '</td>';
+}
+
+function render() {
+    const pages = Math.max(1, Math.ceil(view.length / PAGE_SIZE));
+    page = Math.min(page, pages - 1);
+    const shown = view.slice(page * PAGE_SIZE, (page + 1) * PAGE_SIZE);
+    document.getElementById('rows').innerHTML =
+        shown.map(row => '<tr>' + columns.map(col => cell(row, col)).join('') + '</tr>').join('');
+    document.getElementById('page').textContent =
+        'Page ' + (page + 1) + ' of ' + pages + ' (' + view.length + ' of ' + rows.length + ' images)';
+}
+
+function compare(a, b) {
+    const x = a[sortKey], y = b[sortKey];
+    if (x === y) return 0;
+    if (x === null || x === undefined) return 1;
+    if (y === null || y === undefined) return -1;
+    return (x < y ? -1 : 1) * sortDir;
+}
+
+function update() {
+    const text = document.getElementById('filter').value.toLowerCase();
+    view = text ? rows.filter(row => JSON.stringify(row).toLowerCase().includes(text)) : rows.slice();
+    if (sortKey) view.sort(compare);
+    render();
+}
+
+function sortBy(key) {
+    sortDir = key === sortKey ? -sortDir : 1;
+    sortKey = key;
+    update();
+}
+
+function turn(step) { page = Math.max(0, page + step); render(); }
+
+function load(i) {
+    if (i >= DATA_FILES.length) { update(); return; }
+    const script = document.createElement('script');
+    script.src = DATA_FILES[i];
+    script.onload = () => { if (i === 0) update(); load(i + 1); };
+    document.head.appendChild(script);
+}
+
+document.getElementById('head').innerHTML = columns.map(
+    col => '<th onclick="sortBy(\\'' + col.key + '\\')">' + col.label + '</th>').join('');
+load(0);'''
+
+def format_value(value):
+    return f"{value:.4f}" if isinstance(value, (int, float)) and not isinstance(value, bool) else 'N/A'
+
+def generate_report(header_file, stats_file, thumbnail_file, output_file):
+    # Load data
+    with step_metrics.phase("open"):
+        with open(header_file) as f:
+            header = json.load(f)
+        with open(stats_file) as f:
+            stats = json.load(f)
+        with open(thumbnail_file, 'rb') as f:
+            thumbnail = f.read()
+
+    with step_metrics.phase("compute"):
+        page = render(header, stats, base64.b64encode(thumbnail).decode())
+
+    with step_metrics.phase("write"), open(output_file, 'w') as f:
+        f.write(page)
+
+    print(f"Report generated: {output_file}")
+
+def render(header, stats, thumb_b64):
+    cards = []
+    for key, label in STAT_CARDS:
+        value = stats.get(key)
+        # Counts are shown as they are, everything else with 4 decimals
+        text = str(value) if key == 'total_pixels' and value is not None else format_value(value)
+        cards.append(f'''            <div class="stat-card">
+                <div class="stat-value">{text}</div>
+                <div class="stat-label">{label}</div>
+            </div>''')
+    keywords = [f'            <tr><td>{key}</td><td>{html.escape(str(header[key]))}</td></tr>'
+                for key in IMPORTANT_KEYS if key in header]
+
+    return f'''<!DOCTYPE html>
+<html>
+<head>
+    <title>FITS Image Report</title>
+    <style>{STYLE}
+    </style>
+</head>
+<body>
+    <div class="container">
+        <h1>FITS Image Analysis Report</h1>
+
+        <div class="thumbnail">
+            <img src="data:image/png;base64,{thumb_b64}" alt="Image Preview">
+        </div>
+
+        <h2>Image Statistics</h2>
+        <div class="stats-grid">
+{chr(10).join(cards)}
+        </div>
+
+        <h2>Selected Header Keywords</h2>
+        <table>
+            <tr><th>Keyword</th><th>Value</th></tr>
+{chr(10).join(keywords)}
+        </table>
+
+        <p class="timestamp">Report generated: {datetime.now().isoformat()}</p>
+    </div>
+</body>
+</html>'''
+
+def image_name(path, kind):
+    """Image name from an output file name, e.g. ``m31-stats.json`` -> ``m31``."""
+    name = os.path.basename(path)
+    return name[:-len(SUFFIXES[kind])] if name.endswith(SUFFIXES[kind]) else None
+
+def pair_inputs(headers, stats, thumbnails):
+    """(name, header, stats, thumbnail) per image.
+
+    Files named ``<image>-header.json`` etc. are matched by image name;
+    otherwise the three lists are matched by position.
+    """
+    if not len(headers) == len(stats) == len(thumbnails):
+        raise SystemExit(f"Need one header, stats and thumbnail file per image, got "
+                         f"{len(headers)}, {len(stats)} and {len(thumbnails)}")
+    names = {kind: [image_name(p, kind) for p in paths]
+             for kind, paths in (("header", headers), ("stats", stats), ("thumbnail", thumbnails))}
+    if (all(None not in n and len(set(n)) == len(n) for n in names.values())
+            and set(names["header"]) == set(names["stats"]) == set(names["thumbnail"])):
+        stats_by_name = dict(zip(names["stats"], stats))
+        thumbnails_by_name = dict(zip(names["thumbnail"], thumbnails))
+        return [(n, h, stats_by_name[n], thumbnails_by_name[n]) for n, h in zip(names["header"], headers)]
+    return [(os.path.splitext(os.path.basename(h))[0], h, s, t)
+            for h, s, t in zip(headers, stats, thumbnails)]
+
+def link_or_copy(source, target):
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copyfile(source, target)
+
+def survey_row(name, header_file, stats_file, thumbnail):
+    with open(header_file) as f:
+        header = json.load(f)
+    with open(stats_file) as f:
+        stats = json.load(f)
+    row = {"thumbnail": thumbnail, "image": name,
+           "status": "error" if "error" in stats else "success",
+           "shape": "x".join(str(n) for n in stats.get("shape", [])) or None}
+    row.update({k: header.get(k) for k in SURVEY_KEYWORDS})
+    row.update({k: stats.get(k) for k in SURVEY_STATS})
+    return row
+
+def write_chunk(path, rows):
+    with open(path, 'w') as f:
+        f.write("addRows(")
+        json.dump(rows, f, separators=(',', ':'))
+        f.write(");\n")
+
+def survey_report(output_dir, headers, stats, thumbnails, page_size=PAGE_SIZE):
+    images = pair_inputs(headers, stats, thumbnails)
+    os.makedirs(os.path.join(output_dir, "thumbnails"), exist_ok=True)
+    os.makedirs(os.path.join(output_dir, "data"), exist_ok=True)
+
+    data_files, chunk, failed, used = [], [], 0, set()
+    for name, header_file, stats_file, thumbnail_file in images:
+        with step_metrics.phase("open"):
+            # Thumbnails keep their name unless two inputs share one
+            thumb = os.path.basename(thumbnail_file)
+            stem, ext = os.path.splitext(thumb)
+            n = 1
+            while thumb in used:
+                thumb, n = f"{stem}_{n}{ext}", n + 1
+            used.add(thumb)
+            link_or_copy(thumbnail_file, os.path.join(output_dir, "thumbnails", thumb))
+            row = survey_row(name, header_file, stats_file, "thumbnails/" + thumb)
+        failed += row["status"] != "success"
+        chunk.append(row)
+        if len(chunk) == page_size:
+            with step_metrics.phase("write"):
+                data_files.append(f"data/rows-{len(data_files):05d}.js")
+                write_chunk(os.path.join(output_dir, data_files[-1]), chunk)
+            chunk = []
+    if chunk:
+        with step_metrics.phase("write"):
+            data_files.append(f"data/rows-{len(data_files):05d}.js")
+            write_chunk(os.path.join(output_dir, data_files[-1]), chunk)
+
+    columns = [{"key": "thumbnail", "label": "Preview"}, {"key": "image", "label": "Image"},
+               {"key": "status", "label": "Status"}, {"key": "shape", "label": "Shape"}]
+    columns += [{"key": k, "label": k} for k in SURVEY_KEYWORDS]
+    columns += [{"key": k, "label": k.capitalize()} for k in SURVEY_STATS]
+    script = (f"const PAGE_SIZE = {page_size};\nconst DATA_FILES = {json.dumps(data_files)};"
+              + SURVEY_SCRIPT.replace("__COLUMNS__", json.dumps(columns)))
+    page = f'''<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="utf-8">
+    <title>FITS Survey Report</title>
+    <style>{STYLE}{SURVEY_STYLE}
+    </style>
+</head>
+<body>
+    <div class="container">
+        <h1>FITS Survey Report</h1>
+
+        <div class="stats-grid">
+            <div class="stat-card">
+                <div class="stat-value">{len(images)}</div>
+                <div class="stat-label">Images</div>
+            </div>
+            <div class="stat-card">
+                <div class="stat-value">{len(images) - failed}</div>
+                <div class="stat-label">Analyzed</div>
+            </div>
+            <div class="stat-card">
+                <div class="stat-value">{failed}</div>
+                <div class="stat-label">Failed</div>
+            </div>
+        </div>
+
+        <div class="controls">
+            <input id="filter" type="search" placeholder="Filter" oninput="page = 0; update()">
+            <button onclick="turn(-1)">Previous</button>
+            <button onclick="turn(1)">Next</button>
+            <span id="page">Loading...</span>
+        </div>
+        <noscript><p>The table needs JavaScript; the rows are in the data directory.</p></noscript>
+        <table>
+            <thead><tr id="head"></tr></thead>
+            <tbody id="rows"></tbody>
+        </table>
+
+        <p class="timestamp">Report generated: {datetime.now().isoformat()}</p>
+    </div>
+    <script>{script}
+    </script>
+</body>
+</html>
+'''
+    with step_metrics.phase("write"), open(os.path.join(output_dir, "index.html"), 'w') as f:
+        f.write(page)
+
+    print(f"Survey report generated: {output_dir}/index.html ({len(images)} images, "
+          f"{len(data_files)} data files, {failed} failed)")
+
+if __name__ == "__main__":
+    step_metrics.start("generate-report")
+    parser = argparse.ArgumentParser(description="Generate an HTML report from pipeline outputs.")
+    parser.add_argument("inputs", nargs="*", metavar="FILE",
+                        help="Single-image report: header.json stats.json thumbnail.png output.html")
+    parser.add_argument("--survey", metavar="DIR",
+                        help="Write a report over many images to this directory")
+    parser.add_argument("--headers", nargs="+", default=[], help="Header JSON of each image")
+    parser.add_argument("--stats", nargs="+", default=[], help="Statistics JSON of each image")
+    parser.add_argument("--thumbnails", nargs="+", default=[], help="Thumbnail PNG of each image")
+    parser.add_argument("--page-size", type=int, default=PAGE_SIZE,
+                        help="Rows per table page and per data file")
+    args = parser.parse_args()
+    if args.survey:
+        survey_report(args.survey, args.headers, args.stats, args.thumbnails, args.page_size)
+    elif len(args.inputs) == 4:
+        generate_report(*args.inputs)
+    else:
+        parser.error("give header, stats, thumbnail and output files, or --survey DIR")
+    step_metrics.write()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""Streaming quantiles of image pixels from histogram sketches.
+
+The pixels are read in row blocks, so memory is bounded by one block and
+the sketches. A first histogram spans min..max; bins wider than the
+requested error around each quantile get a finer sketch on a further
+pass, until the error is below ``rel_error`` times the p1-p99 spread.
+"""
+import numpy as np
+
+# Bins per histogram sketch
+SKETCH_BINS = 65536
+# Upper limit on refinement passes over the data
+MAX_REFINE_PASSES = 4
+
+def iter_blocks(rows, block_rows):
+    """Yield the finite values of each row block as float64."""
+    for r0 in range(0, rows.shape[0], block_rows):
+        block = np.asarray(rows[r0:r0 + block_rows], dtype=np.float64)
+        yield block[np.isfinite(block)]
+
+def histogram_pass(rows, block_rows, windows, bins):
+    """Histogram every (lo, hi) window in a single pass over the data.
+
+    Returns one sketch per window: (lo, hi, counts, below) where ``below``
+    is the exact number of values smaller than ``lo``.
+    """
+    counts = [np.zeros(bins, dtype=np.int64) for _ in windows]
+    below = [0] * len(windows)
+    for values in iter_blocks(rows, block_rows):
+        for i, (lo, hi) in enumerate(windows):
+            below[i] += int(np.count_nonzero(values < lo))
+            counts[i] += np.histogram(values, bins=bins, range=(lo, hi))[0]
+    return [(lo, hi, c, b) for (lo, hi), c, b in zip(windows, counts, below)]
+
+def resolvable(lo, hi, bins):
+    """True if ``bins`` float64 bins of lo..hi are wider than the float spacing."""
+    return hi - lo > bins * np.spacing(max(abs(lo), abs(hi)))
+
+def sketch_width(sketch):
+    lo, hi, counts, _ = sketch
+    return (hi - lo) / counts.size
+
+def cdf(sketches, value):
+    """Interpolated number of values <= ``value`` from the finest sketch covering it."""
+    covering = [s for s in sketches if s[0] <= value <= s[1]]
+    lo, hi, counts, below = min(covering, key=sketch_width)
+    width = (hi - lo) / counts.size
+    pos = (value - lo) / width if width > 0 else counts.size
+    i = min(int(pos), counts.size - 1)
+    return below + counts[:i].sum() + counts[i] * min(1.0, pos - i)
+
+def quantile(sketches, rank):
+    """Value at ``rank`` (0..count) from the finest sketch containing it.
+
+    Returns the estimate and the width of the bin it was taken from.
+    """
+    best = None
+    for lo, hi, counts, below in sketches:
+        cumulative = below + np.cumsum(counts)
+        if below <= rank <= cumulative[-1] and cumulative[-1] > below:
+            width = (hi - lo) / counts.size
+            if best is None or width < best[1]:
+                i = int(np.searchsorted(cumulative, rank))
+                i = min(i, counts.size - 1)
+                before = cumulative[i] - counts[i]
+                frac = (rank - before) / counts[i] if counts[i] else 0.0
+                best = (lo + (i + frac) * width, width, lo + i * width)
+    return best
+
+def median_abs_deviation(sketches, median, count, tolerance):
+    """Solve cdf(median + t) - cdf(median - t) = count / 2 by bisection."""
+    lo_t = 0.0
+    hi_t = max(median - sketches[0][0], sketches[0][1] - median)
+    while hi_t - lo_t > tolerance / 4:
+        t = 0.5 * (lo_t + hi_t)
+        inside = cdf(sketches, min(median + t, sketches[0][1])) - cdf(sketches, max(median - t, sketches[0][0]))
+        if inside < count / 2:
+            lo_t = t
+        else:
+            hi_t = t
+    return 0.5 * (lo_t + hi_t)
+
+def sketch_quantiles(rows, block_rows, count, vmin, vmax, std, rel_error, bins=SKETCH_BINS):
+    """Median, p1, p99 and MAD of the finite values in ``rows``.
+
+    ``count``, ``vmin``, ``vmax`` and ``std`` come from a moments pass
+    over the same rows, and ``count`` must be positive.
+    """
+    if vmax == vmin:
+        return {"median": float(vmin), "p1": float(vmin), "p99": float(vmin), "mad": 0.0,
+                "quantile_error_bound": 0.0, "sketch_passes": 0}
+
+    sketches = histogram_pass(rows, block_rows, [(vmin, vmax)], bins)
+    passes = 1
+    ranks = {"p1": 0.01 * count, "median": 0.5 * count, "p99": 0.99 * count}
+
+    while True:
+        estimates = {k: quantile(sketches, r) for k, r in ranks.items()}
+        median = estimates["median"][0]
+        # Tolerance follows the robust spread rather than the std, which
+        # bright sources can inflate by orders of magnitude
+        spread = estimates["p99"][0] - estimates["p1"][0]
+        tolerance = rel_error * (spread if spread > 0 else std)
+        mad = median_abs_deviation(sketches, median, count, tolerance)
+
+        # Each estimate depends on the bins around one or two points; any
+        # bin wider than the tolerance gets its own finer sketch
+        windows = [(e[2], e[2] + e[1]) for e in estimates.values()]
+        for p in (median - mad, median + mad):
+            # On a few-valued image median - mad can fall outside vmin..vmax
+            p = min(max(p, vmin), vmax)
+            covering = [s for s in sketches if s[0] <= p <= s[1]] or sketches[:1]
+            w = sketch_width(min(covering, key=sketch_width))
+            windows.append((max(vmin, p - w), min(vmax, p + w)))
+        error = max((hi - lo) if i < 3 else (hi - lo) / 2 for i, (lo, hi) in enumerate(windows))
+        if error <= tolerance or passes > MAX_REFINE_PASSES:
+            break
+        windows = [(lo, hi) for lo, hi in windows if hi - lo > tolerance and resolvable(lo, hi, bins)]
+        if not windows:
+            break
+        sketches += histogram_pass(rows, block_rows, windows, bins)
+        passes += 1
+
+    result = {k: float(e[0]) for k, e in estimates.items()}
+    result["mad"] = float(mad)
+    # The MAD bisection adds up to a quarter tolerance on top of the bins
+    result["quantile_error_bound"] = float(error + tolerance / 4)
+    result["sketch_passes"] = passes
+    return result
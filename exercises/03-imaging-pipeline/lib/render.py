@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""Render FITS image data as viridis thumbnails without Matplotlib.
+
+ZScale limits follow astropy's ZScaleInterval; the colormap is applied
+with a lookup table and Pillow builds the image.
+"""
+from PIL import Image, ImageDraw
+import numpy as np
+
+# matplotlib's 256-entry viridis colormap as RGB bytes
+VIRIDIS = np.frombuffer(bytes.fromhex(
+    "44015444025544035745055845065a45085b46095c460b5e460c5f460e61470f62471163471265471466471567471669"
+    "47186a48196b481a6c481c6e481d6f481e70482071482172482273482374472575472676472777472878472a79472b7a"
+    "472c7b462d7c462f7c46307d46317e45327f45347f453580453681443781443982433a83433b83433c84423d84423e85"
+    "4240854141864142864043874044873f45873f47883e48883e49893d4a893d4b893d4c893c4d8a3c4e8a3b508a3b518a"
+    "3a528b3a538b39548b39558b38568b38578c37588c37598c365a8c365b8c355c8c355d8c345e8d345f8d33608d33618d"
+    "32628d32638d31648d31658d31668d30678d30688d2f698d2f6a8d2e6b8e2e6c8e2e6d8e2d6e8e2d6f8e2c708e2c718e"
+    "2c728e2b738e2b748e2a758e2a768e2a778e29788e29798e287a8e287a8e287b8e277c8e277d8e277e8e267f8e26808e"
+    "26818e25828e25838d24848d24858d24868d23878d23888d23898d22898d228a8d228b8d218c8d218d8c218e8c208f8c"
+    "20908c20918c1f928c1f938b1f948b1f958b1f968b1e978a1e988a1e998a1e998a1e9a891e9b891e9c891e9d881e9e88"
+    "1e9f881ea0871fa1871fa2861fa38620a48520a58521a68521a78422a78423a88323a98224aa8225ab8126ac8127ad80"
+    "28ae7f29af7f2ab07e2bb17d2cb17d2eb27c2fb37b30b47a32b57a33b67935b77836b87738b97639b9763bba753dbb74"
+    "3ebc7340bd7242be7144be7045bf6f47c06e49c16d4bc26c4dc26b4fc36951c46853c56755c66657c66559c7645bc862"
+    "5ec96160c96062ca5f64cb5d67cc5c69cc5b6bcd596dce5870ce5672cf5574d05477d05279d1517cd24f7ed24e81d34c"
+    "83d34b86d44988d5478bd5468dd64490d64392d74195d73f97d83e9ad83c9dd93a9fd938a2da37a5da35a7db33aadb32"
+    "addc30afdc2eb2dd2cb5dd2bb7dd29bade27bdde26bfdf24c2df22c5df21c7e01fcae01ecde01dcfe11cd2e11bd4e11a"
+    "d7e219dae218dce218dfe318e1e318e4e318e7e419e9e419ece41aeee51bf1e51cf3e51ef6e61ff8e621fae622fde724"
+), dtype=np.uint8).reshape(256, 3)
+
+def zscale_limits(values, nsamples=1000, contrast=0.25, max_reject=0.5,
+                  min_npixels=5, krej=2.5, max_iterations=5):
+    """IRAF ZScale limits, following astropy's ZScaleInterval."""
+    values = values[np.isfinite(values)]
+    stride = int(max(1.0, values.size / nsamples))
+    samples = np.sort(values[::stride][:nsamples])
+    npix = len(samples)
+    vmin, vmax = samples[0], samples[-1]
+
+    minpix = max(min_npixels, int(npix * max_reject))
+    x = np.arange(npix)
+    ngoodpix = npix
+    last_ngoodpix = npix + 1
+    badpix = np.zeros(npix, dtype=bool)
+    kernel = np.ones(max(1, int(npix * 0.01)), dtype=bool)
+
+    for _ in range(max_iterations):
+        if ngoodpix >= last_ngoodpix or ngoodpix < minpix:
+            break
+        fit = np.polyfit(x, samples, deg=1, w=(~badpix).astype(int))
+        flat = samples - np.poly1d(fit)(x)
+        threshold = krej * flat[~badpix].std()
+        badpix[(flat < -threshold) | (flat > threshold)] = True
+        badpix = np.convolve(badpix, kernel, mode='same')
+        last_ngoodpix = ngoodpix
+        ngoodpix = np.sum(~badpix)
+
+    if ngoodpix >= minpix:
+        slope = fit[0] / contrast if contrast > 0 else fit[0]
+        center_pixel = (npix - 1) // 2
+        median = np.median(samples)
+        vmin = max(vmin, median - (center_pixel - 1) * slope)
+        vmax = min(vmax, median + (npix - center_pixel) * slope)
+    return vmin, vmax
+
+def colorize(image, vmin, vmax):
+    """Map values through viridis; non-finite pixels become black."""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        scaled = (image - vmin) / (vmax - vmin) if vmax > vmin else np.zeros_like(image)
+    index = np.clip(np.nan_to_num(scaled * 256, nan=0.0), 0, 255).astype(np.uint8)
+    rgb = VIRIDIS[index]
+    rgb[~np.isfinite(image)] = 0
+    # FITS rows run bottom-up, like imshow(origin='lower')
+    return Image.fromarray(rgb[::-1])
+
+def fit_to_size(img, size):
+    """Resize so the longest side is ``size`` pixels."""
+    scale = size / max(img.size)
+    new_size = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+    if new_size == img.size:
+        return img
+    resample = Image.Resampling.BOX if scale < 1 else Image.Resampling.NEAREST
+    return img.resize(new_size, resample)
+
+def placeholder(size):
+    img = Image.new('RGB', (size, size), 'black')
+    ImageDraw.Draw(img).text((size // 2, size // 2), 'No Data', fill='white', anchor='mm')
+    return img
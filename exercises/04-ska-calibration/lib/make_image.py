@@ -0,0 +1,607 @@
+#!/usr/bin/env python3
+"""Grid, FFT and CLEAN visibilities into a restored FITS image.
+
+Given several sizes, scales or iteration counts (comma-separated), every
+combination is imaged in one run, a parameter sweep. The visibilities are
+streamed from the MS in chunks, and each chunk is gridded onto every
+distinct uv grid (size and scale) at once, so one pass over the MS fills
+as many grids as fit in SWEEP_GRID_BYTES. Each grid is transformed once,
+and the CLEAN runs sharing it start from its dirty image and PSF, in
+parallel with --workers.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from astropy.io import fits
+import scipy.fft
+import scipy.ndimage
+import numpy as np
+import argparse
+import functools
+import itertools
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+
+import ms_io
+import step_metrics
+
+# Kaiser-Bessel gridding kernel: support in cells and shape parameter
+KERNEL_SUPPORT = 7
+KERNEL_BETA = 16.25
+# Kernel samples per cell in the interpolated lookup table
+KERNEL_OVERSAMPLE = 1024
+# Kernel taps accumulated per gridding chunk
+GRID_ENTRIES = 8 * 1024 * 1024
+# uv grids of a sweep filled in the same pass over the MS
+SWEEP_GRID_BYTES = 1024 * 1024 * 1024
+# CLEAN: loop gain, fraction of the peak removed per major cycle,
+# half-size of the PSF patch subtracted in minor cycles, peak-tracking block
+CLEAN_GAIN = 0.1
+MAJOR_GAIN = 0.8
+PATCH_HALF = 256
+PEAK_BLOCK = 32
+# Minor-cycle iterations between exact major cycles, and the growth of the
+# residual peak over the best seen that stops CLEAN as diverging
+MINOR_ITERATIONS = 2000
+DIVERGENCE = 1.5
+# Beam fit: PSF levels tried in turn until the main lobe has enough pixels
+# for the fit, and the minor-axis FWHM in pixels below which it is unreliable
+LOBE_LEVELS = (0.5, 0.35, 0.2, 0.1)
+MIN_LOBE_PIXELS = 12
+MIN_BEAM_PIXELS = 3
+
+UNITS_ARCSEC = {"asec": 1.0, "arcsec": 1.0, "amin": 60.0, "arcmin": 60.0, "deg": 3600.0}
+# Tile compression of the output image: rice quantizes the floats (lossy),
+# gzip keeps every bit (lossless); tiles are square so readers can
+# decompress only the region they need
+COMPRESSION = {"rice": "RICE_1", "gzip": "GZIP_2"}
+COMPRESSION_TILE = 256
+
+def parse_scale(scale):
+    """Pixel scale such as '1asec', '0.5arcsec' or '2amin' in arcseconds."""
+    m = re.fullmatch(r"\s*([0-9.eE+-]+)\s*([a-z]*)\s*", scale)
+    if not m or m.group(2) not in UNITS_ARCSEC:
+        raise SystemExit(f"Cannot parse pixel scale {scale!r}")
+    return float(m.group(1)) * UNITS_ARCSEC[m.group(2)]
+
+def kernel(t):
+    """Kaiser-Bessel kernel at offsets ``t`` (cells) from the sample."""
+    x = np.clip(1 - (2 * t / KERNEL_SUPPORT) ** 2, 0, None)
+    return np.i0(KERNEL_BETA * np.sqrt(x)) / np.i0(KERNEL_BETA)
+
+@functools.lru_cache(maxsize=None)
+def kernel_table():
+    """Kernel tabulated every 1/KERNEL_OVERSAMPLE cell across its support, computed once."""
+    return kernel(np.linspace(-KERNEL_SUPPORT / 2, KERNEL_SUPPORT / 2, KERNEL_SUPPORT * KERNEL_OVERSAMPLE + 1))
+
+def kernel_lookup(t):
+    """Kernel at offsets ``t`` interpolated linearly from ``kernel_table``."""
+    table = kernel_table()
+    x = np.clip((t + KERNEL_SUPPORT / 2) * KERNEL_OVERSAMPLE, 0, table.size - 1)
+    i = np.minimum(x.astype(np.int64), table.size - 2)
+    f = x - i
+    return table[i] * (1 - f) + table[i + 1] * f
+
+@functools.lru_cache(maxsize=None)
+def kernel_taper(m):
+    """Image-plane response of the kernel on an ``m``-pixel axis, for grid correction."""
+    t = np.linspace(-KERNEL_SUPPORT / 2, KERNEL_SUPPORT / 2, 1001)
+    x = (np.arange(m) - m // 2) / m
+    # Uniform samples: the integral's step size cancels in the normalisation
+    taper = (kernel(t)[None, :] * np.cos(2 * np.pi * np.outer(x, t))).sum(axis=1)
+    return taper / taper[m // 2]
+
+def select_rows(index, field):
+    """Field to image and the visibility column to read."""
+    if field is None:
+        corrected = index.get("corrected_fields")
+        field = corrected[0] if corrected else index["fields"][0]["name"]
+    column = "CORRECTED_DATA" if field in index.get("corrected_fields", []) else "DATA"
+    return field, column
+
+def read_visibilities(ms_path, index, field, column):
+    """Unflagged Stokes I samples of ``field`` as chunks of (u, v, vis, weight).
+    
+    There is one sample per row and channel, with u and v in wavelengths.
+    Stokes I is the weighted mean of the parallel hands.
+    """
+    freqs = ms_io.channel_freqs(index)
+    n_chan = index["n_channels"]
+    pols, _ = ms_io.parallel_hands(index)
+    chunk_rows = max(1, GRID_ENTRIES // (n_chan * KERNEL_SUPPORT ** 2))
+    for scan in ms_io.field_scans(index, field):
+        for r0, r1 in ms_io.iter_row_chunks(scan["row_start"], scan["row_stop"], chunk_rows):
+            uvw = ms_io.read_rows(ms_path, "UVW", r0, r1)
+            data = ms_io.read_rows(ms_path, column, r0, r1)[:, :, pols]
+            weight = (~ms_io.read_rows(ms_path, "FLAG", r0, r1)[:, :, pols]).astype(np.float32)
+            w = weight.sum(axis=2).ravel()
+            with np.errstate(invalid="ignore", divide="ignore"):
+                vis = ((data * weight).sum(axis=2).ravel() / w)
+            wavelengths = freqs[None, :] / ms_io.SPEED_OF_LIGHT
+            u = (uvw[:, 0:1] * wavelengths).ravel()
+            v = (uvw[:, 1:2] * wavelengths).ravel()
+            keep = w > 0
+            yield u[keep], v[keep], vis[keep], w[keep]
+
+def grid_chunk(vis_grid, weight_grid, u, v, vis, w, cell_rad):
+    """Add one chunk of (u, v, vis, weight) samples to an m x m uv grid.
+    
+    Every visibility is spread over KERNEL_SUPPORT^2 cells; the taps of the
+    chunk are summed with one bincount over its bounding box. Samples are
+    placed at (v, -u) so the image has RA increasing to the left. The
+    w-term is ignored (small fields only). Returns the samples gridded.
+    """
+    m = vis_grid.shape[0]
+    du = 1.0 / (m * cell_rad)
+    half = KERNEL_SUPPORT // 2
+    taps = np.arange(-half, half + 1)
+    gx = -u / du + m // 2
+    gy = v / du + m // 2
+    keep = (gx >= half) & (gx < m - half - 1) & (gy >= half) & (gy < m - half - 1)
+    if not keep.any():
+        return 0
+    vis, w, gx, gy = vis[keep], w[keep], gx[keep], gy[keep]
+    
+    cx, cy = np.rint(gx).astype(np.int64), np.rint(gy).astype(np.int64)
+    kx = kernel_lookup(cx[:, None] + taps - gx[:, None])
+    ky = kernel_lookup(cy[:, None] + taps - gy[:, None])
+    x0, y0 = cx.min() - half, cy.min() - half
+    nx = cx.max() + half + 1 - x0
+    ny = cy.max() + half + 1 - y0
+    # Flattened bounding-box index of every tap: (nvis, support, support)
+    idx = ((cy[:, None, None] + taps[:, None] - y0) * nx + (cx[:, None, None] + taps - x0)).ravel()
+    taps_w = (ky[:, :, None] * kx[:, None, :] * w[:, None, None]).ravel()
+    tap_vis = (taps_w.reshape(vis.size, -1) * vis[:, None]).ravel()
+    box = (slice(y0, y0 + ny), slice(x0, x0 + nx))
+    vis_grid[box] += (np.bincount(idx, tap_vis.real, ny * nx)
+                      + 1j * np.bincount(idx, tap_vis.imag, ny * nx)).reshape(ny, nx)
+    weight_grid[box] += np.bincount(idx, taps_w, ny * nx).reshape(ny, nx)
+    return vis.size
+
+def grid_visibilities(chunks, grids):
+    """Convolutionally grid Stokes I and its weights onto several uv grids in one pass.
+    
+    ``chunks`` yields (u, v, vis, weight) samples as ``read_visibilities``;
+    ``grids`` lists the (m, cell_rad) of each grid. Every chunk is added to
+    all the grids before the next one is read, so memory holds one chunk
+    and the grids. Returns (vis_grid, weight_grid, n_vis, grid_seconds)
+    for each grid.
+    """
+    out = [[np.zeros((m, m), dtype=np.complex128), np.zeros((m, m), dtype=np.float64), 0, 0.0]
+           for m, _ in grids]
+    for u, v, vis, w in chunks:
+        # Sorted by v, neighbouring taps land on neighbouring grid rows
+        order = np.argsort(v, kind="stable")
+        u, v, vis, w = u[order], v[order], vis[order], w[order]
+        for entry, (_, cell_rad) in zip(out, grids):
+            t0 = time.time()
+            entry[2] += grid_chunk(entry[0], entry[1], u, v, vis, w, cell_rad)
+            entry[3] += time.time() - t0
+    return [tuple(entry) for entry in out]
+
+def grid_bytes(size):
+    """Memory of the visibility and weight grids of an image of ``size`` pixels."""
+    return 24 * (2 * size) ** 2
+
+def grid_batches(groups, budget=SWEEP_GRID_BYTES):
+    """Split (size, scale, settings) groups into runs whose grids fit in ``budget`` together."""
+    batch, used = [], 0
+    for group in groups:
+        if batch and used + grid_bytes(group[0]) > budget:
+            yield batch
+            batch, used = [], 0
+        batch.append(group)
+        used += grid_bytes(group[0])
+    if batch:
+        yield batch
+
+def grid_to_image(grid, threads):
+    """Real part of the centred inverse FFT of a uv grid."""
+    image = scipy.fft.fftshift(scipy.fft.ifft2(scipy.fft.ifftshift(grid), workers=threads))
+    return image.real
+
+def main_lobe(patch, min_pixels=MIN_LOBE_PIXELS):
+    """Pixels of the PSF main lobe: the region around the peak connected to it.
+    
+    The lobe is cut at half maximum, or lower down the lobe if that leaves
+    fewer than ``min_pixels`` to fit, as happens when the beam is sampled
+    by only a few pixels.
+    """
+    c = patch.shape[0] // 2
+    for level in LOBE_LEVELS:
+        labels, _ = scipy.ndimage.label(patch > level)
+        lobe = labels == labels[c, c]
+        if lobe.sum() >= min_pixels:
+            break
+    return lobe
+
+def fit_beam(psf, cell_arcsec):
+    """Gaussian restoring beam (major, minor FWHM in arcsec, PA in deg) fitted to the PSF main lobe."""
+    c = psf.shape[0] // 2
+    h = 32
+    patch = psf[c - h:c + h + 1, c - h:c + h + 1]
+    y, x = np.mgrid[-h:h + 1, -h:h + 1]
+    lobe = main_lobe(patch)
+    # ln p = -(a x^2 + 2 b x y + c y^2) / 2, linear in a, b, c
+    A = np.stack([x[lobe] ** 2, 2 * x[lobe] * y[lobe], y[lobe] ** 2], axis=1) * -0.5
+    (a, b, cc), *_ = np.linalg.lstsq(A, np.log(patch[lobe]), rcond=None)
+    evals, evecs = np.linalg.eigh(np.array([[a, b], [b, cc]]))
+    sigmas = 1 / np.sqrt(np.clip(evals, 1e-12, None))
+    fwhm = sigmas * np.sqrt(8 * np.log(2)) * cell_arcsec
+    # Major axis direction; PA measured from north (up) through east (left)
+    vx, vy = evecs[:, 0]
+    pa = np.degrees(np.arctan2(-vx, vy)) % 180
+    if fwhm[1] < MIN_BEAM_PIXELS * cell_arcsec:
+        print(f"WARNING: the beam ({fwhm[0]:.1f}\" x {fwhm[1]:.1f}\") spans fewer than {MIN_BEAM_PIXELS} "
+              f"pixels of {cell_arcsec:g}\"; the restoring beam is poorly constrained. Use a smaller pixel scale.",
+              file=sys.stderr)
+    return float(fwhm[0]), float(fwhm[1]), float(pa)
+
+def gaussian_beam(shape, bmaj, bmin, pa, cell_arcsec):
+    """Unit-peak elliptical Gaussian centred on the image."""
+    y, x = np.indices(shape, dtype=np.float64)
+    y -= shape[0] // 2
+    x -= shape[1] // 2
+    theta = np.radians(pa)
+    # Rotate to beam axes: major along PA (north through east = -x)
+    major = -x * np.sin(theta) + y * np.cos(theta)
+    minor = x * np.cos(theta) + y * np.sin(theta)
+    s_maj = bmaj / cell_arcsec / np.sqrt(8 * np.log(2))
+    s_min = bmin / cell_arcsec / np.sqrt(8 * np.log(2))
+    return np.exp(-0.5 * ((major / s_maj) ** 2 + (minor / s_min) ** 2))
+
+class Convolver:
+    """Linear convolution of ``n``x``n`` images with a ``2n``x``2n`` centred kernel."""
+    
+    def __init__(self, kernel_2n, threads):
+        self.n = kernel_2n.shape[0] // 2
+        self.threads = threads
+        self.kernel_ft = scipy.fft.rfft2(kernel_2n, workers=threads)
+    
+    def __call__(self, image):
+        n = self.n
+        padded = np.zeros((2 * n, 2 * n), dtype=np.float64)
+        padded[:n, :n] = image
+        out = scipy.fft.irfft2(scipy.fft.rfft2(padded, workers=self.threads) * self.kernel_ft,
+                               s=padded.shape, workers=self.threads)
+        return out[n:, n:]
+
+def hogbom_minor_cycle(residual, model, patch, gain, limit, max_iter, block=PEAK_BLOCK):
+    """Hogbom iterations on ``residual`` until its peak drops below ``limit``.
+    
+    Only the PSF patch around each component is subtracted, and the peak
+    is found from per-block maxima, of which only the blocks touched by
+    the patch are recomputed. The cycle also ends if the peak grows,
+    which a truncated PSF can cause. Returns the number of iterations done.
+    """
+    n = residual.shape[0]
+    h = patch.shape[0] // 2
+    nb = -(-n // block)
+    work = np.zeros((nb * block, nb * block), dtype=residual.dtype)
+    work[:n, :n] = residual
+    bmax = np.zeros((nb, nb), dtype=residual.dtype)
+    barg = np.zeros((nb, nb), dtype=np.int64)
+    
+    def update_blocks(by0, by1, bx0, bx1):
+        sub = np.abs(work[by0 * block:by1 * block, bx0 * block:bx1 * block])
+        sub = sub.reshape(by1 - by0, block, bx1 - bx0, block).transpose(0, 2, 1, 3).reshape(by1 - by0, bx1 - bx0, -1)
+        arg = sub.argmax(axis=2)
+        barg[by0:by1, bx0:bx1] = arg
+        bmax[by0:by1, bx0:bx1] = np.take_along_axis(sub, arg[..., None], axis=2)[..., 0]
+    
+    update_blocks(0, nb, 0, nb)
+    start_peak = bmax.max()
+    done = 0
+    while done < max_iter:
+        by, bx = divmod(int(bmax.argmax()), nb)
+        if bmax[by, bx] < limit or bmax[by, bx] > start_peak:
+            break
+        a = barg[by, bx]
+        y, x = by * block + a // block, bx * block + a % block
+        flux = gain * work[y, x]
+        model[y, x] += flux
+        y0, y1 = max(0, y - h), min(n, y + h + 1)
+        x0, x1 = max(0, x - h), min(n, x + h + 1)
+        work[y0:y1, x0:x1] -= flux * patch[y0 - y + h:y1 - y + h, x0 - x + h:x1 - x + h]
+        update_blocks(y0 // block, (y1 - 1) // block + 1, x0 // block, (x1 - 1) // block + 1)
+        done += 1
+    residual[...] = work[:n, :n]
+    return done
+
+def robust_rms(x):
+    """Noise estimate from the median absolute deviation."""
+    return float(1.4826 * np.median(np.abs(x - np.median(x))))
+
+def clean(dirty, psf_2n, niter, threshold, auto_threshold, threads, timing):
+    """Clark-style CLEAN: Hogbom minor cycles on a PSF patch, exact FFT major cycles.
+    
+    Returns (model, residual, iterations, major_cycles, stop_reason). If a
+    major cycle shows the residual growing, the best model so far is kept.
+    """
+    n = dirty.shape[0]
+    c = psf_2n.shape[0] // 2
+    h = min(PATCH_HALF, n // 2)
+    patch = psf_2n[c - h:c + h + 1, c - h:c + h + 1].astype(np.float32)
+    outside = np.abs(psf_2n).copy()
+    outside[c - h:c + h + 1, c - h:c + h + 1] = 0
+    sidelobe = float(outside.max())
+    convolve = Convolver(psf_2n, threads)
+    
+    residual = dirty.astype(np.float32)
+    model = np.zeros((n, n), dtype=np.float32)
+    iterations, major_cycles, stop_reason = 0, 0, "niter"
+    peak = float(np.abs(residual).max())
+    best = (peak, model.copy(), residual.copy(), iterations)
+    while iterations < niter:
+        level = max(threshold, auto_threshold * robust_rms(residual))
+        if peak <= level:
+            stop_reason = "threshold"
+            break
+        # Stop minor cycles before errors from the truncated PSF dominate
+        limit = max(level, peak * (1 - MAJOR_GAIN), peak * sidelobe)
+        t0 = time.time()
+        done = hogbom_minor_cycle(residual, model, patch, CLEAN_GAIN, limit,
+                                  min(MINOR_ITERATIONS, niter - iterations))
+        timing["clean_minor"] += time.time() - t0
+        t0 = time.time()
+        residual = (dirty - convolve(model)).astype(np.float32)
+        timing["clean_major"] += time.time() - t0
+        iterations += done
+        major_cycles += 1
+        if done == 0:
+            stop_reason = "stalled"
+            break
+        peak = float(np.abs(residual).max())
+        if peak < best[0]:
+            best = (peak, model.copy(), residual.copy(), iterations)
+        elif peak > DIVERGENCE * best[0]:
+            # Cleaning noise with an imperfect PSF: go back to the best state
+            _, model, residual, iterations = best
+            stop_reason = "diverging"
+            break
+    return model, residual, iterations, major_cycles, stop_reason
+
+def write_image(output_file, image_data, header, compression=None, quantize_level=16.0):
+    """Write a float32 image, optionally tile-compressed in the first extension."""
+    image_data = image_data.astype(np.float32, copy=False)
+    if not compression:
+        fits.PrimaryHDU(data=image_data, header=header).writeto(output_file, overwrite=True)
+        return
+    tile = tuple(min(COMPRESSION_TILE, n) for n in image_data.shape)
+    # quantize_level 0 leaves floats unquantized, which only gzip supports
+    level = quantize_level if compression == "rice" else 0.0
+    hdu = fits.CompImageHDU(data=image_data, header=header, compression_type=COMPRESSION[compression],
+                            tile_shape=tile, quantize_level=level,
+                            quantize_method=fits.hdu.compressed.SUBTRACTIVE_DITHER_1)
+    fits.HDUList([fits.PrimaryHDU(), hdu]).writeto(output_file, overwrite=True)
+
+def transform(vis_grid, weight_grid, size, threads):
+    """Dirty image of ``size`` pixels and PSF of twice that size, both grid-corrected."""
+    m = vis_grid.shape[0]
+    taper = kernel_taper(m)
+    taper = np.outer(taper, taper)
+    psf_2n = grid_to_image(weight_grid, threads) / taper
+    norm = psf_2n[m // 2, m // 2]
+    psf_2n /= norm
+    lo = m // 2 - size // 2
+    dirty = (grid_to_image(vis_grid, threads) / taper / norm)[lo:lo + size, lo:lo + size]
+    return dirty, psf_2n
+
+def deconvolve(job):
+    """CLEAN and restore one image from a dirty image and PSF; writes the image and its summary.
+    
+    ``job["dirty"]`` and ``job["psf"]`` are arrays, or .npy files when the
+    image is made in a worker process. Returns the imaging summary.
+    """
+    start = time.time()
+    timing = dict(job["timing"], clean_minor=0.0, clean_major=0.0, restore=0.0, write=0.0)
+    dirty, psf_2n = (np.load(a, mmap_mode="r") if isinstance(a, str) else a for a in (job["dirty"], job["psf"]))
+    size, scale, niter, cell_arcsec = job["size"], job["scale"], job["niter"], job["cell_arcsec"]
+    
+    model, residual, iterations, major_cycles, stop_reason = clean(
+        dirty, psf_2n, niter, job["threshold"], job["auto_threshold"], job["threads"], timing)
+    
+    t0 = time.time()
+    bmaj, bmin, bpa = fit_beam(psf_2n, cell_arcsec)
+    restoring = Convolver(gaussian_beam(psf_2n.shape, bmaj, bmin, bpa, cell_arcsec), job["threads"])
+    image_data = (restoring(model) + residual).astype(np.float32)
+    timing["restore"] = time.time() - t0
+    
+    t0 = time.time()
+    header = fits.Header()
+    header['CTYPE1'] = 'RA---SIN'
+    header['CTYPE2'] = 'DEC--SIN'
+    header['CDELT1'] = -cell_arcsec / 3600
+    header['CDELT2'] = cell_arcsec / 3600
+    header['CRPIX1'] = size // 2 + 1
+    header['CRPIX2'] = size // 2 + 1
+    header['CRVAL1'] = job["ra_deg"]
+    header['CRVAL2'] = job["dec_deg"]
+    header['OBJECT'] = job["field"]
+    header['BUNIT'] = 'JY/BEAM'
+    header['BMAJ'] = bmaj / 3600
+    header['BMIN'] = bmin / 3600
+    header['BPA'] = bpa
+    header['NITER'] = iterations
+    
+    output_file = f"{job['name']}-image.fits"
+    write_image(output_file, image_data, header, job["compression"], job["quantize_level"])
+    timing["write"] = time.time() - t0
+    timing["total"] = sum(job["timing"].values()) + time.time() - start
+    
+    summary = {
+        "image_size": size,
+        "pixel_scale": scale,
+        "field": job["field"],
+        "data_column": job["column"],
+        "n_visibilities": job["n_vis"],
+        "clean_iterations": iterations,
+        "requested_iterations": niter,
+        "major_cycles": major_cycles,
+        "stop_reason": stop_reason,
+        "clean_flux_jy": float(model.sum()),
+        "peak_flux_jy": float(np.max(image_data)),
+        "rms_noise_jy": robust_rms(residual),
+        "beam_major_arcsec": round(bmaj, 3),
+        "beam_minor_arcsec": round(bmin, 3),
+        "beam_pa_deg": round(bpa, 2),
+        "threads": job["threads"],
+        "compression": job["compression"] or "none",
+        "timing": {k: round(v, 3) for k, v in timing.items()},
+        "status": "success"
+    }
+    if job.get("sweep"):
+        summary["sweep"] = job["sweep"]
+    
+    with open(f"{job['name']}-imaging.json", "w") as f:
+        json.dump(summary, f, indent=2)
+    
+    print(f"Image created: {output_file}, peak={summary['peak_flux_jy']:.4f} Jy, "
+          f"{iterations} CLEAN iterations in {major_cycles} major cycles")
+    return summary
+
+def deconvolution_phases(summary):
+    return {k: v for k, v in summary["timing"].items() if k in ("clean_minor", "clean_major", "restore", "write")}
+
+def make_image(ms_path, name, sizes, scales, niters, field=None, threshold=0.0, auto_threshold=3.0, threads=1,
+               compression=None, quantize_level=16.0, workers=1, sweep=False):
+    """Image every combination of ``sizes``, ``scales`` and ``niters``.
+    
+    The visibilities are streamed from the MS onto every (size, scale) grid
+    at once, in passes of grids that fit in SWEEP_GRID_BYTES together. Each
+    grid is transformed once and every iteration count is CLEANed from its
+    dirty image and PSF, in ``workers`` processes if more than one.
+    ``sweep`` (implied by several combinations) names the images by their
+    settings and writes a sweep summary.
+    """
+    sizes, scales, niters = (list(dict.fromkeys(values)) for values in (sizes, scales, niters))
+    settings = list(itertools.product(sizes, scales, niters))
+    sweep = sweep or len(settings) > 1
+    cells = {scale: parse_scale(scale) for scale in scales}
+    ms_path = ms_io.resolve_ms(ms_path)
+    index = ms_io.read_index(ms_path)
+    field, column = select_rows(index, field)
+    fld = index["fields"][ms_io.field_id(index, field)]
+    
+    groups = [(size, scale, list(group))
+              for (size, scale), group in itertools.groupby(settings, key=lambda s: s[:2])]
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 and len(settings) > 1 else None
+    scratch = tempfile.TemporaryDirectory(prefix=".sweep-", dir=".") if pool else None
+    results, names, grids = [], [], []
+    read_seconds, passes = 0.0, 0
+    for batch in grid_batches(groups):
+        # Grid at twice the image size: the PSF must cover every offset
+        # between two image pixels, and the padding reduces aliasing
+        t0 = time.time()
+        gridded = grid_visibilities(read_visibilities(ms_path, index, field, column),
+                                    [(2 * size, np.radians(cells[scale] / 3600)) for size, scale, _ in batch])
+        elapsed = time.time() - t0
+        read = elapsed - sum(entry[3] for entry in gridded)
+        read_seconds += read
+        passes += 1
+        if sweep:
+            step_metrics.add_phases({"read": read})
+        for size, scale, group in batch:
+            g = len(grids)
+            vis_grid, weight_grid, n_vis, grid_seconds = gridded.pop(0)
+            timing = {"read": read, "grid": grid_seconds} if sweep else {"read_grid": elapsed}
+            grid_phase = "grid" if sweep else "read_grid"
+            if n_vis == 0:
+                raise SystemExit(f"No unflagged visibilities for {field} fall on the uv grid")
+            
+            t0 = time.time()
+            dirty, psf_2n = transform(vis_grid, weight_grid, size, threads)
+            del vis_grid, weight_grid
+            timing["fft"] = time.time() - t0
+            step_metrics.add_phases({k: timing[k] for k in (grid_phase, "fft")})
+            grids.append({"image_size": size, "pixel_scale": scale, "images": len(group), "pass": passes,
+                          "grid_seconds": round(timing[grid_phase], 3), "fft_seconds": round(timing["fft"], 3)})
+            
+            if pool:
+                dirty_file = os.path.join(scratch.name, f"dirty-{g}.npy")
+                psf_file = os.path.join(scratch.name, f"psf-{g}.npy")
+                np.save(dirty_file, dirty)
+                np.save(psf_file, psf_2n)
+                dirty, psf_2n = dirty_file, psf_file
+            for _, _, niter in group:
+                job = {"name": f"{name}-{size}px-{scale}-niter{niter}" if sweep else name,
+                       "size": size, "scale": scale, "cell_arcsec": cells[scale], "niter": niter,
+                       "field": field, "column": column, "ra_deg": fld.get("ra_deg", 180.0),
+                       "dec_deg": fld.get("dec_deg", 45.0), "n_vis": n_vis, "dirty": dirty, "psf": psf_2n,
+                       "threshold": threshold, "auto_threshold": auto_threshold, "threads": threads,
+                       "compression": compression, "quantize_level": quantize_level, "timing": timing}
+                if sweep:
+                    job["sweep"] = {"index": len(results), "n_images": len(settings), "images_on_grid": len(group)}
+                names.append(job["name"])
+                if pool:
+                    results.append(pool.submit(deconvolve, job))
+                else:
+                    summary = deconvolve(job)
+                    step_metrics.add_phases(deconvolution_phases(summary))
+                    results.append(summary)
+            del dirty, psf_2n
+    
+    if pool:
+        with step_metrics.phase("clean"):
+            results = [future.result() for future in results]
+        pool.shutdown()
+        scratch.cleanup()
+    if not sweep:
+        return
+    
+    report = {
+        "field": field,
+        "data_column": column,
+        "n_visibilities": results[0]["n_visibilities"],
+        "read_seconds": round(read_seconds, 3),
+        "reads": passes,
+        "workers": workers,
+        "grids": grids,
+        "images": [{"image": f"{image_name}-image.fits", "summary": f"{image_name}-imaging.json",
+                    **{k: r[k] for k in ("image_size", "pixel_scale", "requested_iterations", "clean_iterations",
+                                         "stop_reason", "peak_flux_jy", "rms_noise_jy",
+                                         "beam_major_arcsec", "beam_minor_arcsec")}}
+                   for image_name, r in zip(names, results)],
+    }
+    with step_metrics.phase("write"), open(f"{name}-sweep.json", "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Sweep of {len(settings)} image{'s' if len(settings) > 1 else ''} on "
+          f"{len(grids)} uv grid{'s' if len(grids) > 1 else ''}: visibilities read "
+          f"{'once' if passes == 1 else f'{passes} times'} in {read_seconds:.2f} s")
+
+def int_list(text):
+    return [int(v) for v in text.split(",")]
+
+def str_list(text):
+    return [v.strip() for v in text.split(",")]
+
+if __name__ == "__main__":
+    step_metrics.start("make-image")
+    parser = argparse.ArgumentParser(description="Image a measurement set with gridding, FFT and CLEAN.")
+    parser.add_argument("ms")
+    parser.add_argument("name")
+    parser.add_argument("size", type=int_list, help="Image size in pixels; comma-separated sizes for a sweep")
+    parser.add_argument("scale", type=str_list, help="Pixel scale such as 1asec; comma-separated for a sweep")
+    parser.add_argument("niter", type=int_list, help="CLEAN iterations; comma-separated for a sweep")
+    parser.add_argument("--field", help="Field to image (default: the calibrated target)")
+    parser.add_argument("--threshold", type=float, default=0.0,
+                        help="Stop cleaning when the residual peak falls below this (Jy)")
+    parser.add_argument("--auto-threshold", type=float, default=3.0,
+                        help="Stop cleaning at this many times the residual noise (0 to disable)")
+    parser.add_argument("--threads", type=int, default=1,
+                        help="Threads for the FFTs")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="In a sweep, CLEAN this many images at once in separate processes")
+    parser.add_argument("--sweep", action="store_true",
+                        help="Name the images by their settings and write a sweep summary even for one combination")
+    parser.add_argument("--compression", choices=sorted(COMPRESSION),
+                        help="Tile-compress the image: rice (quantized, lossy) or gzip (lossless)")
+    parser.add_argument("--quantize-level", type=float, default=16.0,
+                        help="Quantization levels per noise sigma for rice compression")
+    args = parser.parse_args()
+    make_image(args.ms, args.name, args.size, args.scale, args.niter,
+               args.field, args.threshold, args.auto_threshold, args.threads,
+               args.compression, args.quantize_level, args.workers, args.sweep)
+    step_metrics.write()
@@ -0,0 +1,483 @@
+#!/usr/bin/env python3
+"""Read and write the workshop's NumPy measurement-set layout.
+
+A measurement set is a directory holding one memory-mappable ``.npy``
+file per column and a small ``ms_index.json``:
+
+    TIME.npy            float64    (nrow,)              seconds
+    ANTENNA1.npy        int32      (nrow,)
+    ANTENNA2.npy        int32      (nrow,)
+    FIELD_ID.npy        int32      (nrow,)
+    UVW.npy             float64    (nrow, 3)            metres
+    DATA.npy            complex64  (nrow, nchan, npol)
+    FLAG.npy            bool       (nrow, nchan, npol)
+    CORRECTED_DATA.npy  complex64  (nrow, nchan, npol)  after calibration
+
+Rows are ordered by time and then baseline. The index lists antennas,
+channel frequencies, fields and scans; each scan is a contiguous row
+range of one field, so a field is selected without reading FIELD_ID.
+
+A subband written by ``split_subbands.py`` holds a block of channels.
+Its visibility columns are links to the files of the full MS, and the
+index records the block as ``channel_window``; ``column`` maps such a
+column and returns a view of the subband's channels. Columns the
+subband writes itself (``FLAG``, ``CORRECTED_DATA``) have only its own
+channels.
+
+The workshop's placeholder measurement set (a directory of empty table
+files, see data/measurement-sets/README.md) is replaced by a small
+deterministic synthetic observation written to the working directory.
+Any other directory without an index is an error.
+"""
+from concurrent.futures import ProcessPoolExecutor
+import json
+import os
+import numpy as np
+
+INDEX_FILE = "ms_index.json"
+SPEED_OF_LIGHT = 299792458.0
+SIDEREAL_DAY = 86164.0
+# Channel window of each subband MS opened so far, by real path
+_windows = {}
+
+def has_index(ms_path):
+    return os.path.exists(os.path.join(ms_path, INDEX_FILE))
+
+def is_placeholder(ms_path):
+    """True for a directory holding only empty files, like ``example.ms``."""
+    if not os.path.isdir(ms_path):
+        return False
+    entries = list(os.scandir(ms_path))
+    return bool(entries) and all(e.is_file() and e.stat().st_size == 0 for e in entries)
+
+def read_index(ms_path):
+    with open(os.path.join(ms_path, INDEX_FILE)) as f:
+        return json.load(f)
+
+def write_index(ms_path, index):
+    tmp = os.path.join(ms_path, INDEX_FILE + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump(index, f, indent=1)
+    os.replace(tmp, os.path.join(ms_path, INDEX_FILE))
+    _windows.pop(os.path.realpath(ms_path), None)
+
+def column_path(ms_path, name):
+    return os.path.join(ms_path, name + ".npy")
+
+def channel_window(ms_path):
+    """(start, stop, n_channels) of a subband MS, or None for a full MS.
+
+    ``start:stop`` are the subband's channels in the linked column files.
+    """
+    key = os.path.realpath(ms_path)
+    if key not in _windows:
+        index = read_index(ms_path) if has_index(ms_path) else {}
+        window = index.get("channel_window")
+        _windows[key] = (window["start"], window["stop"], index["n_channels"]) if window else None
+    return _windows[key]
+
+def column(ms_path, name, mode="r"):
+    """Memory-map a column (``mode="r+"`` to modify it in place).
+
+    A column a subband shares with the full MS, recognised by having more
+    channels than the subband, is cut to the subband's channel window.
+    """
+    data = np.load(column_path(ms_path, name), mmap_mode=mode)
+    window = channel_window(ms_path)
+    if window and data.ndim == 3 and data.shape[1] != window[2]:
+        data = data[:, window[0]:window[1]]
+    return data
+
+def read_rows(ms_path, name, r0, r1):
+    """Copy rows r0:r1 of a column into memory.
+
+    The column is mapped only for the duration of the read, so mapped
+    pages do not accumulate in the resident set of a streaming pass.
+    """
+    data = column(ms_path, name)
+    rows = np.array(data[r0:r1])
+    del data
+    return rows
+
+def create_column(ms_path, name, dtype, shape, fill=None):
+    """Create a column file on disk and return it memory-mapped for writing.
+
+    An existing file is replaced rather than truncated: it may be a link
+    to the column of another measurement set.
+    """
+    path = column_path(ms_path, name)
+    if os.path.exists(path):
+        os.remove(path)
+    data = np.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=shape)
+    if fill is not None:
+        data[...] = fill
+    return data
+
+def channel_freqs(index):
+    return np.asarray(index["channel_freqs_hz"], dtype=np.float64)
+
+def parallel_hands(index):
+    """Indices and names of the parallel-hand correlations (XX, YY or RR, LL).
+
+    The calibrator models are Stokes I, which only the parallel hands see;
+    the cross hands are left uncalibrated.
+    """
+    names = index["polarizations"]
+    pols = [i for i, name in enumerate(names) if name[0] == name[1]]
+    return pols, [names[i] for i in pols]
+
+def check_polarizations(table, arrays, names):
+    """Stop if a solution table was not solved for the correlations ``names``."""
+    solved = [str(name) for name in arrays.get("polarizations", [])]
+    if solved != names:
+        raise SystemExit(f"{table}: solutions for polarizations {solved or 'unknown'}, "
+                         f"expected the parallel hands {names}")
+
+def field_id(index, name):
+    names = [f["name"] for f in index["fields"]]
+    if name not in names:
+        raise SystemExit(f"Field {name!r} not in measurement set (fields: {', '.join(names)})")
+    return names.index(name)
+
+def field_scans(index, name):
+    """Scans of field ``name`` as dicts with row_start/row_stop/time_start/time_stop."""
+    fid = field_id(index, name)
+    return [s for s in index["scans"] if s["field_id"] == fid]
+
+def field_flux(index, name, freqs):
+    """Total flux spectrum of the point sources modelled for field ``name``.
+
+    Returns a flat 1 Jy spectrum if the measurement set has no model.
+    """
+    field = index["fields"][field_id(index, name)]
+    spectrum = np.zeros_like(freqs)
+    for src in field.get("sources", []):
+        spectrum += src["flux_jy"] * (freqs / index["reference_freq_hz"]) ** src.get("spectral_index", 0.0)
+    return spectrum if spectrum.any() else np.ones_like(freqs)
+
+def iter_row_chunks(row_start, row_stop, chunk_rows):
+    for r0 in range(row_start, row_stop, chunk_rows):
+        yield r0, min(r0 + chunk_rows, row_stop)
+
+def baseline_index(ant1, ant2, n_antennas):
+    """Index of baseline (ant1 < ant2) in the row order of one integration."""
+    ant1 = np.asarray(ant1, dtype=np.int64)
+    ant2 = np.asarray(ant2, dtype=np.int64)
+    return ant1 * (2 * n_antennas - ant1 - 1) // 2 + (ant2 - ant1 - 1)
+
+def read_solution_table(table_path):
+    """Load a JSON solution summary and the binary table it names.
+
+    Returns (summary, arrays); arrays is None if the .npz is missing.
+    """
+    with open(table_path) as f:
+        summary = json.load(f)
+    solution_file = summary.get("solution_file")
+    path = os.path.join(os.path.dirname(table_path), solution_file or "")
+    if not solution_file or not os.path.exists(path):
+        return summary, None
+    with np.load(path) as npz:
+        return summary, {name: npz[name] for name in npz.files}
+
+# ---------------------------------------------------------------------------
+# Synthetic observations
+
+# Correlation products for each supported number of polarizations
+# (CASA order), as pairs of feed indices
+CORRELATIONS = {
+    1: (["XX"], [(0, 0)]),
+    2: (["XX", "YY"], [(0, 0), (1, 1)]),
+    4: (["XX", "XY", "YX", "YY"], [(0, 0), (0, 1), (1, 0), (1, 1)]),
+}
+# Scans of the observation simulated for the placeholder MS
+PLACEHOLDER_SCANS = (("3C286", 10), ("SKA-J1234+5678", 30), ("3C286", 10), ("SKA-J1234+5678", 30))
+
+def antenna_layout(rng, n_antennas, max_baseline_m):
+    """Dense core plus three spiral arms, in local XYZ metres."""
+    n_core = max(1, n_antennas // 2)
+    core = rng.normal(0, 0.05 * max_baseline_m, (n_core, 2))
+    n_arm = n_antennas - n_core
+    radius = 0.5 * max_baseline_m * np.geomspace(0.1, 1.0, n_arm)
+    angle = 2 * np.pi * (np.arange(n_arm) % 3) / 3 + 2.5 * np.log(radius / (0.05 * max_baseline_m))
+    arms = np.stack([radius * np.cos(angle), radius * np.sin(angle)], axis=1)
+    xy = np.concatenate([core, arms + rng.normal(0, 20.0, arms.shape)])
+    z = rng.normal(0, 5.0, (n_antennas, 1))
+    return np.concatenate([xy, z], axis=1)
+
+def sky_model(rng, names, n_sources, fov_deg):
+    """Fields with point sources: a bright calibrator first, then targets."""
+    fields = []
+    for i, name in enumerate(names):
+        if i == 0:
+            sources = [{"l_deg": 0.0, "m_deg": 0.0, "flux_jy": 15.0, "spectral_index": -0.5}]
+        else:
+            offsets = rng.uniform(-fov_deg / 2, fov_deg / 2, (n_sources, 2))
+            # Power-law fluxes between 0.1 and 3 Jy
+            flux = 0.1 * (1 - rng.uniform(0, 1 - (0.1 / 3.0) ** 1.5, n_sources)) ** (-1 / 1.5)
+            sources = [{"l_deg": float(l), "m_deg": float(m), "flux_jy": float(f),
+                        "spectral_index": float(rng.normal(-0.7, 0.2))}
+                       for (l, m), f in zip(offsets, flux)]
+        fields.append({"name": name, "ra_deg": 180.0 + 10 * i, "dec_deg": 45.0 - 5 * i,
+                       "sources": sources})
+    return fields
+
+def rfi_events(rng, n_times, n_channels, rfi_level):
+    """Draw RFI as time/channel boxes: persistent lines, broadband bursts and blips."""
+    if rfi_level <= 0:
+        return []
+    events = []
+    for chan in rng.choice(n_channels, size=max(1, n_channels // 200), replace=False):
+        events.append({"kind": "line", "time_start": 0, "time_stop": n_times,
+                       "chan_start": int(chan), "chan_stop": int(chan) + 1,
+                       "amplitude_jy": float(rfi_level * rng.uniform(2, 10))})
+    for t in rng.choice(n_times, size=max(1, n_times // 100), replace=False):
+        events.append({"kind": "burst", "time_start": int(t), "time_stop": int(t) + 1,
+                       "chan_start": 0, "chan_stop": n_channels,
+                       "amplitude_jy": float(rfi_level * rng.uniform(1, 5))})
+    for _ in range(max(1, n_times // 20)):
+        t0, c0 = int(rng.integers(n_times)), int(rng.integers(n_channels))
+        events.append({"kind": "blip", "time_start": t0, "time_stop": min(n_times, t0 + int(rng.integers(1, 4))),
+                       "chan_start": c0, "chan_stop": min(n_channels, c0 + int(rng.integers(1, 16))),
+                       "amplitude_jy": float(rfi_level * rng.uniform(1, 20))})
+    return events
+
+def simulation_truth(index):
+    """Per-feed gains and bandpasses used by the simulation.
+
+    Returns (bandpass (nchan, nant, nfeed), gain_amp, phase0, phase_rate).
+    """
+    sim = index["simulation"]
+    rng = np.random.default_rng(sim["seed"])
+    n_ant, n_feed = index["n_antennas"], sim["n_feeds"]
+    freqs = channel_freqs(index)
+    x = (freqs - freqs.mean()) / (np.ptp(freqs) or 1.0)
+    # Bandpass: smooth ripple in amplitude, delay-like phase slope
+    ripple = rng.uniform(0.02, 0.1, (n_ant, 1, n_feed))
+    period = rng.uniform(2.0, 6.0, (n_ant, 1, n_feed))
+    delay = rng.normal(0, 1.0, (n_ant, 1, n_feed))
+    bandpass = ((1 + ripple * np.cos(2 * np.pi * period * x[None, :, None]))
+                * np.exp(1j * delay * x[None, :, None])).transpose(1, 0, 2)
+    gain_amp = rng.uniform(0.9, 1.1, (n_ant, n_feed))
+    phase0 = rng.uniform(-np.pi, np.pi, (n_ant, n_feed))
+    phase_rate = rng.normal(0, sim["phase_rate_rad_per_hour"] / 3600.0, (n_ant, n_feed))
+    phase0[0] = 0.0
+    phase_rate[0] = 0.0
+    return bandpass.astype(np.complex64), gain_amp, phase0, phase_rate
+
+def phasor(turns):
+    """exp(-2 pi i turns) as complex64.
+
+    Reducing to a fraction of a turn in float64 first keeps float32 sin/cos
+    accurate, and several times faster than a complex128 exp.
+    """
+    angle = (turns - np.floor(turns)).astype(np.float32) * np.float32(-2 * np.pi)
+    out = np.empty(turns.shape, dtype=np.complex64)
+    np.cos(angle, out=out.real)
+    np.sin(angle, out=out.imag)
+    return out
+
+def simulate_block(index, t0, t1, truth):
+    """All columns for integrations t0:t1 (rows t0 * nbl : t1 * nbl)."""
+    n_ant, n_bl = index["n_antennas"], index["n_baselines"]
+    freqs = channel_freqs(index)
+    ant1_bl, ant2_bl = np.triu_indices(n_ant, 1)
+    t_idx = np.repeat(np.arange(t0, t1), n_bl)
+    ant1, ant2 = np.tile(ant1_bl, t1 - t0), np.tile(ant2_bl, t1 - t0)
+    times = index["time_start"] + (t_idx + 0.5) * index["integration_time"]
+    field = np.asarray(index["time_to_field"])[t_idx]
+
+    # Earth rotation: hour angle sweeps 15 deg per hour
+    xyz = np.asarray(index["antenna_positions_m"])
+    dec = np.deg2rad(np.array([f["dec_deg"] for f in index["fields"]]))[field]
+    ha = 2 * np.pi * (times - index["time_start"]) / SIDEREAL_DAY - np.pi / 4
+    b = xyz[ant2] - xyz[ant1]
+    u = np.sin(ha) * b[:, 0] + np.cos(ha) * b[:, 1]
+    v = -np.sin(dec) * np.cos(ha) * b[:, 0] + np.sin(dec) * np.sin(ha) * b[:, 1] + np.cos(dec) * b[:, 2]
+    w = np.cos(dec) * np.cos(ha) * b[:, 0] - np.cos(dec) * np.sin(ha) * b[:, 1] + np.sin(dec) * b[:, 2]
+
+    # Stokes I point sources: one (rows, nchan) phasor per source
+    model = np.zeros((t_idx.size, freqs.size), dtype=np.complex64)
+    for fid, fld in enumerate(index["fields"]):
+        sel = np.nonzero(field == fid)[0]
+        if sel.size == 0:
+            continue
+        for src in fld["sources"]:
+            l, m = np.deg2rad(src["l_deg"]), np.deg2rad(src["m_deg"])
+            delay = (u[sel] * l + v[sel] * m + w[sel] * (np.sqrt(1 - l * l - m * m) - 1)) / SPEED_OF_LIGHT
+            spectrum = src["flux_jy"] * (freqs / index["reference_freq_hz"]) ** src["spectral_index"]
+            model[sel] += spectrum.astype(np.float32) * phasor(np.outer(delay, freqs))
+
+    bandpass, gain_amp, phase0, phase_rate = truth
+    dt = (times - index["time_start"])[:, None, None]
+    gains = gain_amp[None] * np.exp(1j * (phase0[None] + phase_rate[None] * dt))
+    rows = np.arange(t_idx.size)
+    g1 = (gains[rows, ant1][:, None, :] * bandpass[:, ant1].transpose(1, 0, 2)).astype(np.complex64)
+    g2 = (gains[rows, ant2][:, None, :] * bandpass[:, ant2].transpose(1, 0, 2)).astype(np.complex64)
+    _, feeds = CORRELATIONS[index["n_polarizations"]]
+    vis = np.empty((t_idx.size, freqs.size, len(feeds)), dtype=np.complex64)
+    for p, (f1, f2) in enumerate(feeds):
+        vis[:, :, p] = g1[:, :, f1] * np.conj(g2[:, :, f2])
+        vis[:, :, p] *= model if f1 == f2 else 0
+
+    # Noise drawn per integration so blocks can be written in any order
+    sigma = index["simulation"]["noise_jy"] / np.sqrt(2)
+    seed = index["simulation"]["seed"]
+    for t in range(t0, t1):
+        rng = np.random.default_rng([seed, 2, t])
+        shape = (n_bl,) + vis.shape[1:]
+        noise = rng.standard_normal(shape + (2,), dtype=np.float32).view(np.complex64)[..., 0]
+        vis[(t - t0) * n_bl:(t - t0 + 1) * n_bl] += sigma * noise
+
+    add_rfi(index, vis, t0, t1, b)
+    return {
+        "TIME": times, "ANTENNA1": ant1.astype(np.int32), "ANTENNA2": ant2.astype(np.int32),
+        "FIELD_ID": field.astype(np.int32), "UVW": np.stack([u, v, w], axis=1), "DATA": vis,
+    }
+
+def add_rfi(index, vis, t0, t1, baselines):
+    """Add the RFI events overlapping integrations t0:t1 to ``vis`` in place.
+
+    RFI arrives from the horizon, so it is strongest on short baselines and
+    has a random phase per baseline and integration.
+    """
+    n_bl = index["n_baselines"]
+    washing = np.exp(-np.hypot(baselines[:, 0], baselines[:, 1]) / index["simulation"]["rfi_scale_m"])
+    seed = index["simulation"]["seed"]
+    for e, event in enumerate(index["simulation"]["rfi"]):
+        a, z = max(t0, event["time_start"]), min(t1, event["time_stop"])
+        if a >= z:
+            continue
+        # Random phases per integration, like the noise
+        phase = np.concatenate([np.random.default_rng([seed, 3, e, t]).uniform(0, 1, n_bl)
+                                for t in range(a, z)])
+        r0, r1 = (a - t0) * n_bl, (z - t0) * n_bl
+        amplitude = event["amplitude_jy"] * washing[r0:r1] * np.exp(2j * np.pi * phase)
+        c0, c1 = event["chan_start"], event["chan_stop"]
+        vis[r0:r1, c0:c1] += amplitude[:, None, None].astype(np.complex64)
+
+def write_block(ms_path, index, t0, t1, truth):
+    """Simulate integrations t0:t1 and write them into the column files."""
+    block = simulate_block(index, t0, t1, truth)
+    n_bl = index["n_baselines"]
+    for name, values in block.items():
+        # Map the column only while writing so resident pages stay bounded
+        data = column(ms_path, name, mode="r+")
+        data[t0 * n_bl:t1 * n_bl] = values
+        data.flush()
+        del data
+    return block["DATA"].nbytes
+
+def simulate_ms(ms_path, n_antennas=16, n_channels=512, n_polarizations=2, scans=PLACEHOLDER_SCANS,
+                integration_time=10.0, freq_start_hz=1.3e9, channel_width_hz=200e3,
+                noise_jy=0.5, n_sources=5, rfi_level=5.0, max_baseline_m=4000.0,
+                block_mb=64, workers=1, seed=2025, progress=None):
+    """Write a synthetic observation to ``ms_path`` in blocks of whole integrations.
+
+    ``scans`` is a sequence of (field name, number of integrations); the
+    first field is the calibrator, a bright point source at the phase
+    centre, and the others get ``n_sources`` fainter sources. The sky is
+    corrupted by per-feed gains and bandpasses, thermal noise and RFI of
+    ``rfi_level`` times the noise. Noise is drawn per integration, so the
+    data do not depend on ``block_mb`` or ``workers``. ``progress`` is
+    called as progress(index, blocks_done, n_blocks, bytes_written),
+    once before the first block and after each one. Returns the index.
+    """
+    if n_polarizations not in CORRELATIONS:
+        raise SystemExit(f"Polarizations must be one of {sorted(CORRELATIONS)}")
+    rng = np.random.default_rng([seed, 1])
+    os.makedirs(ms_path, exist_ok=True)
+    n_bl = n_antennas * (n_antennas - 1) // 2
+    names = list(dict.fromkeys(name for name, _ in scans))
+
+    time_to_field, scan_list, n_times = [], [], 0
+    for name, n_int in scans:
+        fid = names.index(name)
+        scan_list.append({"field_id": fid, "row_start": n_times * n_bl, "row_stop": (n_times + n_int) * n_bl,
+                          "time_start": 4.0e9 + n_times * integration_time,
+                          "time_stop": 4.0e9 + (n_times + n_int) * integration_time})
+        time_to_field += [fid] * n_int
+        n_times += n_int
+
+    polarizations, _ = CORRELATIONS[n_polarizations]
+    index = {
+        "format": "npy-ms",
+        "version": 1,
+        "n_rows": n_times * n_bl,
+        "n_antennas": n_antennas,
+        "n_baselines": n_bl,
+        "n_channels": n_channels,
+        "n_polarizations": n_polarizations,
+        "n_times": n_times,
+        "polarizations": polarizations,
+        "integration_time": integration_time,
+        "time_start": 4.0e9,
+        "reference_freq_hz": freq_start_hz + channel_width_hz * n_channels / 2,
+        "channel_freqs_hz": (freq_start_hz + channel_width_hz * np.arange(n_channels)).tolist(),
+        "antenna_names": [f"SKA{i + 1:03d}" for i in range(n_antennas)],
+        "antenna_positions_m": antenna_layout(rng, n_antennas, max_baseline_m).tolist(),
+        "fields": sky_model(rng, names, n_sources, fov_deg=0.3),
+        "scans": scan_list,
+        "time_to_field": time_to_field,
+        "columns": ["TIME", "ANTENNA1", "ANTENNA2", "FIELD_ID", "UVW", "DATA", "FLAG"],
+        "simulation": {
+            "seed": seed,
+            "noise_jy": noise_jy,
+            "phase_rate_rad_per_hour": 1.0,
+            "n_feeds": 1 if n_polarizations == 1 else 2,
+            "rfi_scale_m": 0.1 * max_baseline_m,
+            "rfi": rfi_events(rng, n_times, n_channels, rfi_level * noise_jy),
+        },
+    }
+
+    n_rows = n_times * n_bl
+    shapes = {
+        "TIME": (np.float64, (n_rows,)), "ANTENNA1": (np.int32, (n_rows,)),
+        "ANTENNA2": (np.int32, (n_rows,)), "FIELD_ID": (np.int32, (n_rows,)),
+        "UVW": (np.float64, (n_rows, 3)),
+        "DATA": (np.complex64, (n_rows, n_channels, n_polarizations)),
+        # Created sparse: unflagged until a flagger runs
+        "FLAG": (np.bool_, (n_rows, n_channels, n_polarizations)),
+    }
+    for name, (dtype, shape) in shapes.items():
+        create_column(ms_path, name, dtype, shape).flush()
+
+    truth = simulation_truth(index)
+    row_bytes = n_channels * n_polarizations * np.dtype(np.complex64).itemsize
+    block_times = max(1, int(block_mb * 1024 * 1024 // (row_bytes * n_bl)))
+    blocks = [(t0, min(t0 + block_times, n_times)) for t0 in range(0, n_times, block_times)]
+    report = progress or (lambda *args: None)
+    report(index, 0, len(blocks), 0)
+    written = 0
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(write_block, ms_path, index, t0, t1, truth) for t0, t1 in blocks]
+            for i, future in enumerate(futures, start=1):
+                written += future.result()
+                report(index, i, len(blocks), written)
+    else:
+        for i, (t0, t1) in enumerate(blocks, start=1):
+            written += write_block(ms_path, index, t0, t1, truth)
+            report(index, i, len(blocks), written)
+
+    # The index is written last: a directory without one is incomplete
+    write_index(ms_path, index)
+    return index
+
+def resolve_ms(ms_path, workdir="."):
+    """Return a measurement set with visibilities for ``ms_path``.
+
+    The placeholder measurement set is replaced by the default synthetic
+    observation, written once to ``workdir/synthetic.ms``. Anything else
+    without an index, such as a CASA measurement set, stops the tool.
+    """
+    if has_index(ms_path):
+        return ms_path
+    if not is_placeholder(ms_path):
+        raise SystemExit(
+            f"{ms_path} has no {INDEX_FILE}, so it is not in the workshop's NumPy "
+            "layout; write one with data/measurement-sets/generate_ms.py")
+    synthetic = os.path.join(workdir, "synthetic.ms")
+    if not has_index(synthetic):
+        print(f"No visibilities in {ms_path}; simulating {synthetic}")
+        simulate_ms(synthetic)
+    return synthetic
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""Stage a measurement set without duplicating its visibility data.
+
+Files are hardlinked into the new MS when possible, reflinked (copy on
+write) when the filesystem supports it, and copied only as a last
+resort. Columns the step is going to modify, and small metadata files,
+are always copied so the input MS is never written through a link.
+
+Links cannot cross filesystems. cwltool mounts the inputs and the output
+directory of a containerised step separately, so there every file falls
+back to a copy; the fallback is counted in the statistics and reported
+on stderr. Steps run with --no-container share one filesystem and link.
+"""
+import errno
+import fcntl
+import os
+import shutil
+import stat
+import sys
+
+# linux/fs.h FICLONE: share extents between two files (btrfs, XFS, ...)
+FICLONE = 0x40049409
+# Files below this size are copied; linking them saves nothing
+SMALL_FILE_BYTES = 1024 * 1024
+
+def is_column(name, columns):
+    """True if ``name`` is the storage of one of ``columns`` (FLAG, FLAG.npy, FLAG/...)."""
+    return name.split(".")[0] in columns
+
+def reflink(src, dst):
+    with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+        fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+    shutil.copystat(src, dst)
+
+def link_file(src, dst, stats):
+    """Hardlink, else reflink, else copy ``src`` to ``dst``.
+
+    A copy is also counted as a fallback, with the reason the links failed.
+    """
+    size = os.path.getsize(src)
+    try:
+        os.link(src, dst)
+        stats["linked_files"] += 1
+        stats["linked_bytes"] += size
+        return
+    except OSError as e:
+        if e.errno not in (errno.EXDEV, errno.EPERM, errno.EACCES, errno.EMLINK, errno.ENOTSUP):
+            raise
+        reason = f"hardlink: {e.strerror}"
+    try:
+        reflink(src, dst)
+        stats["reflinked_files"] += 1
+        stats["reflinked_bytes"] += size
+        return
+    except OSError as e:
+        if os.path.exists(dst):
+            os.remove(dst)
+        reason += f", reflink: {e.strerror}"
+    copy_file(src, dst, stats)
+    stats["fallback_files"] += 1
+    stats["fallback_bytes"] += size
+    stats["fallback_reason"] = reason
+
+def can_link(src, dst_dir):
+    """True if ``src`` can be hardlinked or reflinked into ``dst_dir``."""
+    probe = os.path.join(dst_dir, f".link-probe-{os.getpid()}")
+    try:
+        try:
+            os.link(src, probe)
+        except OSError:
+            with open(src, 'rb') as fsrc, open(probe, 'wb') as fdst:
+                fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+        return True
+    except OSError:
+        return False
+    finally:
+        if os.path.exists(probe):
+            os.remove(probe)
+
+def describe_staging(stats):
+    """Bytes linked, reflinked and copied, for a log line."""
+    parts = [f"{verb} {stats[verb + '_bytes'] / 1e6:.1f} MB" for verb in ("linked", "reflinked", "copied")
+             if stats[verb + "_bytes"] or verb == "copied"]
+    return ", ".join(parts)
+
+def warn_fallback(ms_path, output_ms, stats):
+    """Report on stderr the files that were meant to be linked but were copied."""
+    if not stats.get("fallback_files"):
+        return
+    n = stats["fallback_files"]
+    print(f"WARNING: {n} file{'s' if n != 1 else ''} of {ms_path} ({stats['fallback_bytes'] / 1e6:.1f} MB) "
+          f"could not be linked into {output_ms} ({stats['fallback_reason']}) and were copied. "
+          "Links cannot cross filesystems, such as the separate input and output mounts of a "
+          "containerised step; run cwltool with --no-container to stage without copying.",
+          file=sys.stderr)
+
+def copy_file(src, dst, stats):
+    shutil.copy2(src, dst)
+    # Inputs are often staged read-only; copies are ours to modify
+    os.chmod(dst, os.stat(dst).st_mode | stat.S_IWUSR)
+    stats["copied_files"] += 1
+    stats["copied_bytes"] += os.path.getsize(src)
+
+def stage_ms(ms_path, output_ms, modified_columns=(), mode="link", exclude_columns=(), warn=True):
+    """Create ``output_ms`` from ``ms_path`` and return staging statistics.
+
+    With ``mode="copy"`` the whole MS is copied as before. With
+    ``mode="link"`` only ``modified_columns`` and small files are copied.
+    ``exclude_columns`` are left out; the caller writes them. Files that
+    could not be linked are reported on stderr unless ``warn`` is False.
+    """
+    ms_path = os.path.realpath(ms_path)
+    if os.path.realpath(output_ms) == ms_path:
+        raise ValueError(f"Refusing to stage {ms_path} onto itself")
+    if os.path.exists(output_ms):
+        shutil.rmtree(output_ms)
+    stats = {"mode": mode, "linked_files": 0, "linked_bytes": 0,
+             "reflinked_files": 0, "reflinked_bytes": 0,
+             "copied_files": 0, "copied_bytes": 0,
+             "fallback_files": 0, "fallback_bytes": 0, "fallback_reason": None}
+
+    for root, dirs, files in os.walk(ms_path):
+        rel = os.path.relpath(root, ms_path)
+        top = rel.split(os.sep)[0]
+        os.makedirs(os.path.join(output_ms, rel), exist_ok=True)
+        for name in files:
+            src = os.path.join(root, name)
+            dst = os.path.join(output_ms, rel, name)
+            if is_column(name if rel == "." else top, exclude_columns):
+                continue
+            modified = is_column(name if rel == "." else top, modified_columns)
+            if mode == "copy" or modified or os.path.getsize(src) < SMALL_FILE_BYTES:
+                copy_file(src, dst, stats)
+            else:
+                link_file(src, dst, stats)
+
+    if warn:
+        warn_fallback(ms_path, output_ms, stats)
+    return stats
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""Batched StEFCal gain solver shared by the calibration tools.
+
+Visibilities are averaged per baseline into Hermitian antenna matrices
+and many independent problems (channels, polarizations, time intervals)
+are solved in one vectorized iteration.
+"""
+import numpy as np
+
+import ms_io
+
+MAX_ITER = 100
+TOLERANCE = 1e-6
+
+def sum_by_key(keys, values):
+    """Sum ``values`` (along axis 0) over equal ``keys``; returns (unique keys, sums)."""
+    order = np.argsort(keys, kind="stable")
+    keys = keys[order]
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    return keys[starts], np.add.reduceat(values[order], starts, axis=0)
+
+def cross_correlations(ant1, ant2, vis, weight, n_ant):
+    """Drop autocorrelations and conjugate (q, p) rows to (p, q).
+
+    Returns baseline indices with the matching visibilities and weights.
+    """
+    cross = ant1 != ant2
+    a1, a2 = ant1[cross], ant2[cross]
+    vis, weight = vis[cross], weight[cross]
+    swapped = a1 > a2
+    vis[swapped] = np.conj(vis[swapped])
+    bl = ms_io.baseline_index(np.minimum(a1, a2), np.maximum(a1, a2), n_ant)
+    return bl, vis, weight
+
+def baseline_matrices(vis_sum, counts, n_ant):
+    """Hermitian visibility and weight matrices from per-baseline sums.
+
+    ``vis_sum`` and ``counts`` have the baseline on the last axis; the
+    result has shape (..., nant, nant) with zero weight on the diagonal.
+    """
+    p, q = np.triu_indices(n_ant, 1)
+    lead = vis_sum.shape[:-1]
+    R = np.zeros(lead + (n_ant, n_ant), dtype=np.complex128)
+    W = np.zeros(lead + (n_ant, n_ant), dtype=np.float64)
+    mean = vis_sum / np.maximum(counts, 1)
+    R[..., p, q] = mean
+    R[..., q, p] = np.conj(mean)
+    W[..., p, q] = counts
+    W[..., q, p] = counts
+    return R, W
+
+def stefcal(R, W, model, max_iter=MAX_ITER, tol=TOLERANCE):
+    """Solve R ~ g g^H * model for a batch of independent problems.
+
+    ``R`` and ``W`` have shape (batch, nant, nant) and ``model`` (batch,)
+    holds the flux of a point source at the phase centre. Every problem
+    is updated at once; each iteration solves all antenna gains with the
+    others fixed and averages every second step (Salvini & Wijnholds 2014).
+    Returns gains (batch, nant), the iteration count and a converged mask.
+    """
+    batch, n_ant = R.shape[:2]
+    # A[b, p, q] = W_qp conj(R_qp) M: num_p = sum_q A[b, p, q] g_q
+    A = (W * np.conj(R)).transpose(0, 2, 1) * model[:, None, None]
+    Wt = W.transpose(0, 2, 1) * (np.abs(model) ** 2)[:, None, None]
+    g = np.ones((batch, n_ant), dtype=np.complex128)
+    converged = np.zeros(batch, dtype=bool)
+    i = 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for i in range(1, max_iter + 1):
+            num = np.matmul(A, g[..., None])[..., 0]
+            den = np.matmul(Wt, (np.abs(g) ** 2)[..., None])[..., 0]
+            g_new = np.where(den > 0, num / den, 0)
+            if i % 2 == 0:
+                g_new = 0.5 * (g_new + g)
+            change = np.linalg.norm(g_new - g, axis=1) / np.maximum(np.linalg.norm(g_new, axis=1), 1e-30)
+            g = g_new
+            converged = change < tol
+            if converged.all():
+                break
+    return g, i, converged
+
+def solution_snr(R, W, model, g):
+    """Per-antenna SNR |g| / sigma_g from the residual scatter of each problem."""
+    predicted = g[:, :, None] * np.conj(g[:, None, :]) * model[:, None, None]
+    resid = np.abs(R - predicted) ** 2
+    n_vis = (W > 0).sum(axis=(1, 2))
+    dof = np.maximum(n_vis - 2 * g.shape[1], 1)
+    # Variance of a single sample; an average of W samples has variance sigma2 / W
+    sigma2 = (W * resid).sum(axis=(1, 2)) / dof
+    information = np.matmul(W.transpose(0, 2, 1), (np.abs(g) ** 2)[..., None])[..., 0] * np.abs(model[:, None]) ** 2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        snr = np.abs(g) * np.sqrt(information / sigma2[:, None])
+    return np.nan_to_num(snr, nan=0.0, posinf=0.0)
+
+def reference_phase(g, refant):
+    """Rotate each solution so antenna ``refant`` has zero phase."""
+    ref = g[:, refant]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rotation = np.where(np.abs(ref) > 0, np.conj(ref) / np.abs(ref), 1)
+    return g * rotation[:, None]
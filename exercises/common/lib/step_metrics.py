@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""Resource metrics of one workflow step, written to metrics.json.
+
+A step calls ``start`` first, wraps its stages in ``phase`` (or adds
+timings it already measures with ``add_phases``), and calls ``write``
+at the end. Wall time is counted from process start: interpreter
+start-up and imports up to ``start`` are the "startup" phase, and time
+outside any phase is reported as "other". Peak memory is VmHWM from
+/proc: ru_maxrss of a process started by fork can include the memory of
+the process that started it. CPU time includes worker processes once
+they have exited; I/O counters cover the step's own process.
+"""
+from contextlib import contextmanager
+import json
+import os
+import resource
+import time
+
+METRICS_FILE = "metrics.json"
+
+_state = {"step": None, "start": time.time(), "phases": {}, "nested": []}
+
+def process_start_time():
+    """Wall-clock time this process started, or None if /proc is unavailable."""
+    try:
+        with open("/proc/self/stat") as f:
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return time.time() - uptime + start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return None
+
+def read_proc(path):
+    """Key/value lines of a /proc file as a dict of strings; empty if unavailable."""
+    try:
+        with open(path) as f:
+            return dict(line.split(":", 1) for line in f if ":" in line)
+    except OSError:
+        return {}
+
+def start(step):
+    """Name the step; time since process start is its "startup" phase."""
+    _state["step"] = step
+    _state["start"] = process_start_time() or _state["start"]
+    _state["phases"]["startup"] = time.time() - _state["start"]
+
+@contextmanager
+def phase(name):
+    """Add the time spent in the ``with`` block to phase ``name``.
+    
+    Phases may nest; time in an inner phase is not counted again in the outer.
+    """
+    t0 = time.time()
+    _state["nested"].append(0.0)
+    try:
+        yield
+    finally:
+        elapsed = time.time() - t0
+        inner = _state["nested"].pop()
+        if _state["nested"]:
+            _state["nested"][-1] += elapsed
+        add_phases({name: elapsed - inner})
+
+def add_phases(timings):
+    for name, seconds in timings.items():
+        _state["phases"][name] = _state["phases"].get(name, 0.0) + seconds
+
+def write(path=METRICS_FILE, **extra):
+    """Write metrics.json for the step and return its contents."""
+    wall = time.time() - _state["start"]
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    user = own.ru_utime + children.ru_utime
+    system = own.ru_stime + children.ru_stime
+    status = read_proc("/proc/self/status")
+    io = {k: int(v) for k, v in read_proc("/proc/self/io").items()}
+    peak_kb = int(status["VmHWM"].split()[0]) if "VmHWM" in status else own.ru_maxrss
+    phases = dict(_state["phases"])
+    phases["other"] = max(0.0, wall - sum(phases.values()))
+    try:
+        cores = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cores = os.cpu_count()
+    
+    metrics = {
+        "step": _state["step"],
+        "wall_seconds": round(wall, 3),
+        "phases": {k: round(v, 3) for k, v in phases.items()},
+        "cpu_user_seconds": round(user, 3),
+        "cpu_system_seconds": round(system, 3),
+        "cpu_utilization": round((user + system) / wall, 3) if wall > 0 else None,
+        "available_cores": cores,
+        "peak_rss_mb": round(peak_kb / 1024, 1),
+        "io": {
+            # Bytes through read/write calls; memory-mapped access is not included
+            "read_bytes": io.get("rchar"),
+            "write_bytes": io.get("wchar"),
+            # Bytes fetched from or written to storage, including memmap page faults
+            "storage_read_bytes": io.get("read_bytes"),
+            "storage_write_bytes": io.get("write_bytes"),
+        },
+        **extra,
+    }
+    with open(path, "w") as f:
+        json.dump(metrics, f, indent=2)
+    return metrics